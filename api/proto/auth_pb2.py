@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   package='auth',
   syntax='proto3',
   serialized_options=None,
-  serialized_pb=b'\n\nauth.proto\x12\x04\x61uth\"\x16\n\x05Token\x12\r\n\x05token\x18\x01 \x01(\t\"H\n\x07Profile\x12\x17\n\x0fhas_valid_token\x18\x01 \x01(\x08\x12\n\n\x02id\x18\x02 \x01(\x03\x12\x18\n\x04role\x18\x03 \x01(\x0e\x32\n.auth.Role*\x1b\n\x04Role\x12\x08\n\x04User\x10\x00\x12\t\n\x05\x41\x64min\x10\x01\x32,\n\x04\x41uth\x12$\n\x06Verify\x12\x0b.auth.Token\x1a\r.auth.Profileb\x06proto3'
+  serialized_pb=b'\n\nauth.proto\x12\x04\x61uth\"&\n\x05Token\x12\r\n\x05token\x18\x01 \x01(\t\x12\x0e\n\x06strict\x18\x02 \x01(\x08\"%\n\x06Tokens\x12\x1b\n\x06tokens\x18\x01 \x03(\x0b\x32\x0b.auth.Token\"H\n\x07Profile\x12\x17\n\x0fhas_valid_token\x18\x01 \x01(\x08\x12\n\n\x02id\x18\x02 \x01(\x03\x12\x18\n\x04role\x18\x03 \x01(\x0e\x32\n.auth.Role\"+\n\x08Profiles\x12\x1f\n\x08profiles\x18\x01 \x03(\x0b\x32\r.auth.Profile*\x1b\n\x04Role\x12\x08\n\x04User\x10\x00\x12\t\n\x05\x41\x64min\x10\x01\x32\x87\x01\n\x04\x41uth\x12$\n\x06Verify\x12\x0b.auth.Token\x1a\r.auth.Profile\x12,\n\nVerifyMany\x12\x0b.auth.Token\x1a\r.auth.Profile(\x01\x30\x01\x12+\n\x0bVerifyBatch\x12\x0c.auth.Tokens\x1a\x0e.auth.Profilesb\x06proto3'
 )
 
 _ROLE = _descriptor.EnumDescriptor(
@@ -39,8 +39,8 @@ _ROLE = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   serialized_options=None,
-  serialized_start=118,
-  serialized_end=145,
+  serialized_start=218,
+  serialized_end=245,
 )
 _sym_db.RegisterEnumDescriptor(_ROLE)
 
@@ -64,6 +64,13 @@ _TOKEN = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='strict', full_name='auth.Token.strict', index=1,
+      number=2, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -77,7 +84,38 @@ _TOKEN = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=20,
-  serialized_end=42,
+  serialized_end=58,
+)
+
+
+_TOKENS = _descriptor.Descriptor(
+  name='Tokens',
+  full_name='auth.Tokens',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='tokens', full_name='auth.Tokens.tokens', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=60,
+  serialized_end=97,
 )
 
 
@@ -121,13 +159,48 @@ _PROFILE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=44,
-  serialized_end=116,
+  serialized_start=99,
+  serialized_end=171,
 )
 
+
+_PROFILES = _descriptor.Descriptor(
+  name='Profiles',
+  full_name='auth.Profiles',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='profiles', full_name='auth.Profiles.profiles', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=173,
+  serialized_end=216,
+)
+
+_TOKENS.fields_by_name['tokens'].message_type = _TOKEN
 _PROFILE.fields_by_name['role'].enum_type = _ROLE
+_PROFILES.fields_by_name['profiles'].message_type = _PROFILE
 DESCRIPTOR.message_types_by_name['Token'] = _TOKEN
+DESCRIPTOR.message_types_by_name['Tokens'] = _TOKENS
 DESCRIPTOR.message_types_by_name['Profile'] = _PROFILE
+DESCRIPTOR.message_types_by_name['Profiles'] = _PROFILES
 DESCRIPTOR.enum_types_by_name['Role'] = _ROLE
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -138,6 +211,13 @@ Token = _reflection.GeneratedProtocolMessageType('Token', (_message.Message,), {
   })
 _sym_db.RegisterMessage(Token)
 
+Tokens = _reflection.GeneratedProtocolMessageType('Tokens', (_message.Message,), {
+  'DESCRIPTOR' : _TOKENS,
+  '__module__' : 'auth_pb2'
+  # @@protoc_insertion_point(class_scope:auth.Tokens)
+  })
+_sym_db.RegisterMessage(Tokens)
+
 Profile = _reflection.GeneratedProtocolMessageType('Profile', (_message.Message,), {
   'DESCRIPTOR' : _PROFILE,
   '__module__' : 'auth_pb2'
@@ -145,6 +225,13 @@ Profile = _reflection.GeneratedProtocolMessageType('Profile', (_message.Message,
   })
 _sym_db.RegisterMessage(Profile)
 
+Profiles = _reflection.GeneratedProtocolMessageType('Profiles', (_message.Message,), {
+  'DESCRIPTOR' : _PROFILES,
+  '__module__' : 'auth_pb2'
+  # @@protoc_insertion_point(class_scope:auth.Profiles)
+  })
+_sym_db.RegisterMessage(Profiles)
+
 
 
 _AUTH = _descriptor.ServiceDescriptor(
@@ -153,8 +240,8 @@ _AUTH = _descriptor.ServiceDescriptor(
   file=DESCRIPTOR,
   index=0,
   serialized_options=None,
-  serialized_start=147,
-  serialized_end=191,
+  serialized_start=248,
+  serialized_end=383,
   methods=[
   _descriptor.MethodDescriptor(
     name='Verify',
@@ -165,6 +252,24 @@ _AUTH = _descriptor.ServiceDescriptor(
     output_type=_PROFILE,
     serialized_options=None,
   ),
+  _descriptor.MethodDescriptor(
+    name='VerifyMany',
+    full_name='auth.Auth.VerifyMany',
+    index=1,
+    containing_service=None,
+    input_type=_TOKEN,
+    output_type=_PROFILE,
+    serialized_options=None,
+  ),
+  _descriptor.MethodDescriptor(
+    name='VerifyBatch',
+    full_name='auth.Auth.VerifyBatch',
+    index=2,
+    containing_service=None,
+    input_type=_TOKENS,
+    output_type=_PROFILES,
+    serialized_options=None,
+  ),
 ])
 _sym_db.RegisterServiceDescriptor(_AUTH)
 
@@ -18,6 +18,16 @@ class AuthStub(object):
                 request_serializer=auth__pb2.Token.SerializeToString,
                 response_deserializer=auth__pb2.Profile.FromString,
                 )
+        self.VerifyMany = channel.stream_stream(
+                '/auth.Auth/VerifyMany',
+                request_serializer=auth__pb2.Token.SerializeToString,
+                response_deserializer=auth__pb2.Profile.FromString,
+                )
+        self.VerifyBatch = channel.unary_unary(
+                '/auth.Auth/VerifyBatch',
+                request_serializer=auth__pb2.Tokens.SerializeToString,
+                response_deserializer=auth__pb2.Profiles.FromString,
+                )
 
 
 class AuthServicer(object):
@@ -29,6 +39,18 @@ class AuthServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def VerifyMany(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def VerifyBatch(self, request, context):
+        """Missing associated documentation comment in .proto file"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AuthServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -37,6 +59,16 @@ def add_AuthServicer_to_server(servicer, server):
                     request_deserializer=auth__pb2.Token.FromString,
                     response_serializer=auth__pb2.Profile.SerializeToString,
             ),
+            'VerifyMany': grpc.stream_stream_rpc_method_handler(
+                    servicer.VerifyMany,
+                    request_deserializer=auth__pb2.Token.FromString,
+                    response_serializer=auth__pb2.Profile.SerializeToString,
+            ),
+            'VerifyBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.VerifyBatch,
+                    request_deserializer=auth__pb2.Tokens.FromString,
+                    response_serializer=auth__pb2.Profiles.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'auth.Auth', rpc_method_handlers)
@@ -62,3 +94,35 @@ class Auth(object):
             auth__pb2.Profile.FromString,
             options, channel_credentials,
             call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def VerifyMany(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/auth.Auth/VerifyMany',
+            auth__pb2.Token.SerializeToString,
+            auth__pb2.Profile.FromString,
+            options, channel_credentials,
+            call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def VerifyBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/auth.Auth/VerifyBatch',
+            auth__pb2.Tokens.SerializeToString,
+            auth__pb2.Profiles.FromString,
+            options, channel_credentials,
+            call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -125,6 +125,23 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM':          'id',
 }
 
+# Sign tokens with RSA key pair if provided, so other services can verify them using public key
+# from `/api/jwks` without calling auth service
+
+JWT_PRIVATE_KEY_PATH = os.environ.get('JWT_PRIVATE_KEY_PATH')
+JWT_PUBLIC_KEY_PATH = os.environ.get('JWT_PUBLIC_KEY_PATH')
+
+if JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH:
+    with open(JWT_PRIVATE_KEY_PATH) as private_key, open(JWT_PUBLIC_KEY_PATH) as public_key:
+        SIMPLE_JWT.update({
+            'ALGORITHM':     'RS256',
+            'SIGNING_KEY':   private_key.read(),
+            'VERIFYING_KEY': public_key.read(),
+        })
+
+# Always check profile in database on token verification instead of trusting its claims
+AUTH_STRICT_VERIFY = bool(os.environ.get('AUTH_STRICT_VERIFY'))
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -26,6 +26,7 @@ from backend.views import (
     register_admin,
     register_user,
     confirm_registration,
+    jwks,
     CustomTokenObtainPairView,
     CustomTokenVerifyView,
     CustomTokenRefreshView,
@@ -42,6 +43,7 @@ urlpatterns = [
 
     path("api/refresh_token", CustomTokenRefreshView.as_view()),
     path("api/verify_token", CustomTokenVerifyView.as_view()),
+    path("api/jwks", jwks),
 ]
 
 if os.environ.get("AUTH_GRPC_MODE"):
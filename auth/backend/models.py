@@ -21,6 +21,23 @@ class Profile(models.Model):
         ),
         default=GRPCUser,
     )
+    version = models.PositiveIntegerField(
+        default=0,
+    )
+
+    def save(
+        self,
+        *args,
+        **kwargs,
+    ) -> None:
+        """
+        Bump version on every update, so tokens with stale claims can be detected.
+        """
+
+        if self.pk is not None:
+            self.version += 1
+
+        super().save(*args, **kwargs)
 
     @staticmethod
     def register(
@@ -3,11 +3,27 @@
 from rest_framework import serializers
 from django_grpc_framework import proto_serializers
 
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.tokens import (
+    AccessToken,
+    RefreshToken,
+    Token,
+)
+
 from api.proto import auth_pb2
 
 from backend.models import Profile
 
 
+ROLE_CLAIM = "role"
+PROFILE_ID_CLAIM = "profile_id"
+PROFILE_VERSION_CLAIM = "profile_version"
+
+
 class ProfileProtoSerializer(proto_serializers.ModelProtoSerializer):
     has_valid_token = serializers.BooleanField(default=False)
 
@@ -16,3 +32,57 @@ class ProfileProtoSerializer(proto_serializers.ModelProtoSerializer):
         model = Profile
         proto_class = auth_pb2.Profile
         fields = ["has_valid_token", "id", "role"]
+
+
+def set_profile_claims(
+    token: Token,
+    profile: Profile,
+) -> Token:
+    """
+    Embed profile info into token, so it can be verified without database.
+    :param token: token to modify.
+    :param profile: profile of token owner.
+    :return: the same token.
+    """
+
+    token[ROLE_CLAIM] = profile.role
+    token[PROFILE_ID_CLAIM] = profile.id
+    token[PROFILE_VERSION_CLAIM] = profile.version
+
+    return token
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issue tokens with profile claims.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        profile = Profile.objects.filter(user=user).first()
+        if profile is not None:
+            set_profile_claims(token, profile)
+
+        return token
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Reissue profile claims from database instead of copying them from refresh token.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+
+        access = AccessToken(data["access"])
+        profile = Profile.objects.filter(user_id=access[api_settings.USER_ID_CLAIM]).first()
+        if profile is None:
+            return data
+
+        data["access"] = str(set_profile_claims(access, profile))
+        if "refresh" in data:
+            data["refresh"] = str(set_profile_claims(RefreshToken(data["refresh"]), profile))
+
+        return data
@@ -1,5 +1,11 @@
 # coding=utf-8
 
+import queue
+import threading
+
+import typing as tp
+
+from django.conf import settings
 from django.contrib.auth.models import User
 
 from rest_framework_simplejwt.tokens import UntypedToken
@@ -7,8 +13,141 @@ from rest_framework_simplejwt.exceptions import TokenError
 
 from django_grpc_framework.services import Service
 
+from api.proto import auth_pb2
+
 from backend.models import Profile
-from backend.serializers import ProfileProtoSerializer
+from backend.serializers import (
+    ProfileProtoSerializer,
+    ROLE_CLAIM,
+    PROFILE_ID_CLAIM,
+    PROFILE_VERSION_CLAIM,
+)
+
+
+VERIFY_MANY_BATCH_SIZE = 256
+
+# marks end of request stream
+END_OF_STREAM = object()
+
+
+def profile_from_claims(
+    token: UntypedToken,
+    strict: bool,
+) -> tp.Optional[auth_pb2.Profile]:
+    """
+    Build profile from token claims without database query.
+    :param token: verified token.
+    :param strict: whether database check is requested.
+    :return: profile (from gRPC specification) or None if database must be checked.
+    """
+
+    if strict or settings.AUTH_STRICT_VERIFY:
+        return None
+
+    if ROLE_CLAIM not in token or PROFILE_ID_CLAIM not in token:
+        return None
+
+    return auth_pb2.Profile(
+        has_valid_token=True,
+        id=token[PROFILE_ID_CLAIM],
+        role=token[ROLE_CLAIM],
+    )
+
+
+def claims_are_current(
+    token: UntypedToken,
+    profile: Profile,
+) -> bool:
+    """
+    :param token: verified token.
+    :param profile: profile of token owner from database.
+    :return: whether profile has not changed (e.g. role was not revoked) since token was issued,
+        tokens without version claim carry no profile claims to go stale.
+    """
+
+    return token.get(PROFILE_VERSION_CLAIM, profile.version) == profile.version
+
+
+def verify_tokens(
+    tokens: tp.List[auth_pb2.Token],
+) -> tp.List[auth_pb2.Profile]:
+    """
+    Verify tokens fetching all profiles not resolved from claims with single query.
+    :param tokens: tokens (from gRPC specification).
+    :return: profiles (from gRPC specification) in the same order as tokens.
+    """
+
+    results: tp.List[tp.Optional[auth_pb2.Profile]] = []
+    verified: tp.List[tp.Optional[UntypedToken]] = []
+    user_ids: tp.List[tp.Optional[int]] = []
+    for request in tokens:
+        try:
+            token = UntypedToken(request.token)
+            user_id = token["id"]
+        except (TokenError, KeyError) as e:
+            print(e)
+            results.append(auth_pb2.Profile(has_valid_token=False))
+            verified.append(None)
+            user_ids.append(None)
+            continue
+
+        results.append(profile_from_claims(token, request.strict))
+        verified.append(token)
+        user_ids.append(user_id)
+
+    profiles_by_user_id: tp.Dict[int, Profile] = {
+        profile.user_id: profile
+        for profile in Profile.objects.filter(
+            user_id__in={
+                user_id
+                for user_id, result in zip(user_ids, results)
+                if result is None
+            },
+        )
+    }
+
+    profiles = []
+    for token, user_id, result in zip(verified, user_ids, results):
+        if result is not None:
+            profiles.append(result)
+            continue
+
+        profile = profiles_by_user_id.get(user_id)
+        if profile is None or not claims_are_current(token, profile):
+            profile = Profile(user=User())
+        else:
+            profile.has_valid_token = True
+
+        profiles.append(ProfileProtoSerializer(profile).message)
+
+    return profiles
+
+
+def read_requests(
+    request_iterator: tp.Iterator[auth_pb2.Token],
+    arrived: queue.Queue,
+    context,
+) -> None:
+    """
+    Move requests of stream to queue as they arrive, so that they can be taken without waiting for more.
+    """
+
+    def put(item) -> None:
+        # response stream is not read anymore once call is cancelled
+        while context.is_active():
+            try:
+                arrived.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    try:
+        for request in request_iterator:
+            put(request)
+    except Exception as e:
+        print(f"request stream is interrupted: {e!r}")
+    finally:
+        put(END_OF_STREAM)
 
 
 class Auth(Service):
@@ -19,7 +158,14 @@ class Auth(Service):
     def Verify(self, request, context):
         try:
             token = UntypedToken(request.token)
+
+            message = profile_from_claims(token, request.strict)
+            if message is not None:
+                return message
+
             profile = Profile.objects.get(user_id=token["id"])
+            if not claims_are_current(token, profile):
+                raise TokenError("Token was issued before profile was changed")
             profile.has_valid_token = True
         except TokenError as e:
             print(e)
@@ -28,3 +174,37 @@ class Auth(Service):
         profile_serializer = ProfileProtoSerializer(profile)
 
         return profile_serializer.message
+
+    def VerifyMany(self, request_iterator, context):
+        """
+        Verify stream of tokens, profiles of tokens which have already arrived are fetched together
+        (up to `VERIFY_MANY_BATCH_SIZE`), so client which waits for every answer is not blocked.
+        """
+
+        arrived = queue.Queue(maxsize=VERIFY_MANY_BATCH_SIZE)
+        threading.Thread(target=read_requests, args=(request_iterator, arrived, context), daemon=True).start()
+
+        while True:
+            try:
+                batch = [arrived.get(timeout=1)]
+            except queue.Empty:
+                if not context.is_active():
+                    return
+                continue
+
+            while len(batch) < VERIFY_MANY_BATCH_SIZE and batch[-1] is not END_OF_STREAM:
+                try:
+                    batch.append(arrived.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch[-1] is END_OF_STREAM:
+                yield from verify_tokens(batch[:-1])
+                return
+
+            yield from verify_tokens(batch)
+
+    def VerifyBatch(self, request, context):
+        profiles = verify_tokens(request.tokens)
+
+        return auth_pb2.Profiles(profiles=profiles)
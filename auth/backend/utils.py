@@ -2,25 +2,32 @@
 
 import os
 import json
+import base64
+import hashlib
+import functools
 
 import typing as tp
 
-import pika
-
+from django.conf import settings
 from django.urls import reverse
 
+from jwt.algorithms import RSAAlgorithm
+
+from mq.publisher import (
+    ConfirmationTimeout,
+    Publisher,
+)
+
 
-class MessageQueueProvider:
+# registration waits for broker while its transaction is open, so it gives up soon
+CONFIRMATION_TIMEOUT = float(os.environ.get("CONFIRMATION_TIMEOUT", 5))  # seconds
+
+
+class MessageQueueProvider(Publisher):
     """
-    Provides messages to RabbitMQ.
+    Publishes confirmation messages to notification queues.
     """
 
-    def __init__(
-        self,
-    ) -> None:
-        self.connection_ = None
-        return
-
     def send_confirmation(
         self,
         queue: str,
@@ -28,20 +35,13 @@ class MessageQueueProvider:
         subject: str,
         body: str,
         retry_count: int = 5,
+        timeout: float = CONFIRMATION_TIMEOUT,
     ) -> None:
-        if not self.connection_ or self.connection_.is_closed:
-            self.connection_ = pika.BlockingConnection(
-                parameters=pika.ConnectionParameters(
-                    host=os.environ.get("MQ_HOST"),
-                    port=int(os.environ.get("MQ_PORT")),
-                    heartbeat=None,
-                )
-            )
-
-        channel = self.connection_.channel()
-        channel.queue_declare(
-            queue=queue
-        )
+        """
+        Publish confirmation and wait until broker confirms it.
+        Raises `ConfirmationTimeout` if confirmation is not confirmed in time and is withdrawn, so it is never sent.
+        Confirmation already handed to broker is not withdrawn, it is delivered later.
+        """
 
         body = json.dumps(
             obj={
@@ -52,11 +52,14 @@ class MessageQueueProvider:
             }
         )
 
-        channel.basic_publish(
-            exchange="",
-            routing_key=queue,
-            body=body,
-        )
+        delivery = self.publish(queue, body.encode(), timeout=timeout)
+        if self.wait_for_confirm(delivery, timeout):
+            return
+
+        if self.withdraw(delivery):
+            raise ConfirmationTimeout(f"confirmation for {recipient} is not confirmed by broker")
+
+        print(f"confirmation for {recipient} is sent but not confirmed by broker yet")
 
         return
 
@@ -104,3 +107,31 @@ def get_according_notification_queue(
 
 def get_local_network_ip():
     return "http://192.168.1.71"
+
+
+@functools.lru_cache(maxsize=None)
+def get_jwks() -> tp.Dict[str, tp.List[tp.Dict[str, str]]]:
+    """
+    Assemble JWK set with public key used for token verification.
+    :return: JWK set, empty if tokens are signed with symmetric key.
+    """
+
+    algorithm = settings.SIMPLE_JWT.get("ALGORITHM", "HS256")
+    verifying_key = settings.SIMPLE_JWT.get("VERIFYING_KEY")
+
+    if not algorithm.startswith("RS") or not verifying_key:
+        return {"keys": []}
+
+    jwk = json.loads(RSAAlgorithm.to_jwk(RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(verifying_key)))
+
+    # RFC 7638 thumbprint
+    thumbprint = json.dumps(
+        obj={"e": jwk["e"], "kty": jwk["kty"], "n": jwk["n"]},
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    jwk["kid"] = base64.urlsafe_b64encode(hashlib.sha256(thumbprint.encode()).digest()).decode().rstrip("=")
+    jwk["alg"] = algorithm
+    jwk["use"] = "sig"
+
+    return {"keys": [jwk]}
@@ -2,6 +2,7 @@
 
 
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import transaction
 
 from rest_framework.decorators import api_view
 from rest_framework.request import Request
@@ -11,6 +12,7 @@ from rest_framework.status import (
     HTTP_201_CREATED,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 
 from rest_framework_simplejwt.tokens import (
@@ -27,12 +29,19 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from mq.publisher import ConfirmationTimeout
+
 from api.proto.auth_pb2 import Admin
 
 from backend.models import Profile
+from backend.serializers import (
+    CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
+)
 from backend.utils import (
     message_queue_provider,
     get_according_notification_queue,
+    get_jwks,
     make_confirmation_message,
 )
 
@@ -68,26 +77,37 @@ def register_user(
             status=HTTP_400_BAD_REQUEST,
         )
 
-    user = Profile.register(
-        email=email,
-        password=password,
-    )
+    try:
+        # user is not registered if confirmation could not be sent, so registration can be retried
+        with transaction.atomic():
+            user = Profile.register(
+                email=email,
+                password=password,
+            )
 
-    queue = get_according_notification_queue(
-        prefix="sms" if phone_number else "email",
-    )
+            queue = get_according_notification_queue(
+                prefix="sms" if phone_number else "email",
+            )
 
-    body = make_confirmation_message(
-        view=confirm_registration,
-        confirmation_token=RefreshToken.for_user(user),
-    )
+            body = make_confirmation_message(
+                view=confirm_registration,
+                confirmation_token=RefreshToken.for_user(user),
+            )
 
-    message_queue_provider.send_confirmation(
-        queue=queue,
-        recipient=phone_number if phone_number else email,
-        subject="Registration confirmation",
-        body=body,
-    )
+            message_queue_provider.send_confirmation(
+                queue=queue,
+                recipient=phone_number if phone_number else email,
+                subject="Registration confirmation",
+                body=body,
+            )
+    except ConfirmationTimeout as e:
+        print(f"failed to send confirmation: {e!r}")
+        return Response(
+            data={
+                "message": "Confirmation could not be sent, try again later."
+            },
+            status=HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
     device = "phone" if phone_number else "email address"
 
@@ -198,11 +218,29 @@ def confirm_registration(
     )
 
 
+@api_view(["GET"])
+def jwks(
+    request: Request,
+) -> Response:
+    """
+    Publish public keys for local token verification by other services.
+    :param request: empty request.
+    :return: JWK set.
+    """
+
+    return Response(
+        data=get_jwks(),
+        status=HTTP_200_OK,
+    )
+
+
 class CustomTokenRefreshView(TokenRefreshView):
     """
-    Change message.
+    Change message and refresh profile claims.
     """
 
+    serializer_class = CustomTokenRefreshSerializer
+
     def post(
         self,
         request: Request,
@@ -228,9 +266,11 @@ class CustomTokenRefreshView(TokenRefreshView):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
-    Reroute username to email.
+    Reroute username to email and embed profile claims.
     """
 
+    serializer_class = CustomTokenObtainPairSerializer
+
     def post(
         self,
         request: Request,
@@ -0,0 +1,571 @@
+# coding=utf-8
+
+import os
+import json
+import asyncio
+import time
+import base64
+import hashlib
+import itertools
+import threading
+import urllib.request
+
+import typing as tp
+
+from collections import OrderedDict
+
+import jwt
+import grpc
+
+from asgiref.sync import sync_to_async
+from jwt.algorithms import RSAAlgorithm
+
+from rest_framework.request import Request
+
+try:
+    from grpc import aio
+except ImportError:  # grpcio < 1.32
+    from grpc.experimental import aio
+
+from api.proto.auth_pb2_grpc import AuthStub
+from api.proto.auth_pb2 import (
+    Profile,
+    Token,
+)
+
+
+ROLE_CLAIM = "role"
+PROFILE_ID_CLAIM = "profile_id"
+PROFILE_VERSION_CLAIM = "profile_version"
+
+
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 4096))
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", 60))  # seconds
+
+AUTH_GRPC_POOL_SIZE = int(os.environ.get("AUTH_GRPC_POOL_SIZE", 2))
+AUTH_GRPC_TIMEOUT = float(os.environ.get("AUTH_GRPC_TIMEOUT", 1))  # seconds
+AUTH_GRPC_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 5000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.initial_reconnect_backoff_ms", 100),
+    ("grpc.min_reconnect_backoff_ms", 100),
+    ("grpc.max_reconnect_backoff_ms", 5000),
+]
+
+AUTH_JWKS_URL = os.environ.get(
+    "AUTH_JWKS_URL",
+    f"http://{os.environ.get('AUTH_HOST')}:{os.environ.get('AUTH_PORT')}/api/jwks",
+)
+AUTH_JWKS_REFRESH = float(os.environ.get("AUTH_JWKS_REFRESH", 300))  # seconds
+AUTH_JWKS_TIMEOUT = float(os.environ.get("AUTH_JWKS_TIMEOUT", 1))  # seconds
+
+# Check every token in auth service (e.g. to respect revoked roles) instead of trusting its claims
+AUTH_STRICT_VERIFY = bool(os.environ.get("AUTH_STRICT_VERIFY"))
+# Otherwise claims of every profile are checked in auth service at least that often
+AUTH_PROFILE_CHECK_INTERVAL = float(os.environ.get("AUTH_PROFILE_CHECK_INTERVAL", 60))  # seconds
+
+
+def unverified_claims(
+    token: str,
+) -> tp.Dict[str, tp.Any]:
+    """
+    Read claims without verifying signature, they may be trusted only after token is verified.
+    :param token: encoded JWT.
+    :return: claims, empty if token is malformed.
+    """
+
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, TypeError, ValueError):
+        return {}
+
+    return claims if isinstance(claims, dict) else {}
+
+
+class VerificationCache:
+    """
+    LRU cache of verified profiles keyed by token digest.
+    Every entry lives no longer than `ttl` seconds and never outlives token's `exp` claim.
+    """
+
+    def __init__(
+        self,
+        max_size: int = AUTH_CACHE_SIZE,
+        ttl: float = AUTH_CACHE_TTL,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries_: tp.OrderedDict[str, tp.Tuple[Profile, float]] = OrderedDict()
+        self.lock_ = threading.Lock()
+        return
+
+    @staticmethod
+    def _digest(
+        token: str,
+    ) -> str:
+        return hashlib.blake2b(token.encode()).hexdigest()
+
+    @staticmethod
+    def _expiration(
+        token: str,
+    ) -> float:
+        """
+        Read `exp` claim without verifying signature, it is used only to bound entry lifetime.
+        :param token: encoded JWT.
+        :return: expiration timestamp or 0 if token is malformed.
+        """
+
+        try:
+            return float(unverified_claims(token)["exp"])
+        except (KeyError, TypeError, ValueError):
+            return 0
+
+    def get(
+        self,
+        token: str,
+    ) -> tp.Optional[Profile]:
+        key = self._digest(token)
+
+        with self.lock_:
+            entry = self.entries_.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            profile, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries_[key]
+                self.misses += 1
+                return None
+
+            self.entries_.move_to_end(key)
+            self.hits += 1
+
+        return profile
+
+    def put(
+        self,
+        token: str,
+        profile: Profile,
+    ) -> None:
+        expires_at = min(time.time() + self.ttl, self._expiration(token))
+        if expires_at <= time.time() or self.max_size <= 0:
+            return
+
+        key = self._digest(token)
+
+        with self.lock_:
+            self.entries_[key] = (profile, expires_at)
+            self.entries_.move_to_end(key)
+            while len(self.entries_) > self.max_size:
+                self.entries_.popitem(last=False)
+
+        return
+
+    def stats(
+        self,
+    ) -> tp.Dict[str, int]:
+        with self.lock_:
+            return {
+                "size":   len(self.entries_),
+                "hits":   self.hits,
+                "misses": self.misses,
+            }
+
+
+verification_cache = VerificationCache()
+
+
+class ProfileVersions:
+    """
+    Profile versions recently confirmed by auth service in database, keyed by profile id.
+    Token verified by its signature (or by auth service without database) is trusted only if profile version
+    in its claims was confirmed within `check_interval`, otherwise auth service checks it in database.
+    So token issued before profile was changed (e.g. role was revoked) is rejected at most `check_interval`
+    (plus `AUTH_CACHE_TTL` of verification cache) after the change.
+    """
+
+    def __init__(
+        self,
+        max_size: int = AUTH_CACHE_SIZE,
+        check_interval: float = AUTH_PROFILE_CHECK_INTERVAL,
+    ) -> None:
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.entries_: tp.OrderedDict[int, tp.Tuple[tp.Optional[int], float]] = OrderedDict()
+        self.lock_ = threading.Lock()
+        return
+
+    def confirmed(
+        self,
+        claims: tp.Dict[str, tp.Any],
+    ) -> bool:
+        """
+        :param claims: claims of verified token.
+        :return: whether profile version in claims is confirmed recently.
+        """
+
+        with self.lock_:
+            entry = self.entries_.get(claims.get(PROFILE_ID_CLAIM))
+
+        if entry is None:
+            return False
+
+        version, checked_at = entry
+        return version == claims.get(PROFILE_VERSION_CLAIM) and time.time() - checked_at < self.check_interval
+
+    def confirm(
+        self,
+        claims: tp.Dict[str, tp.Any],
+    ) -> None:
+        """
+        :param claims: claims of token verified by auth service in database.
+        """
+
+        profile_id = claims.get(PROFILE_ID_CLAIM)
+        if profile_id is None or self.max_size <= 0:
+            return
+
+        with self.lock_:
+            self.entries_[profile_id] = (claims.get(PROFILE_VERSION_CLAIM), time.time())
+            self.entries_.move_to_end(profile_id)
+            while len(self.entries_) > self.max_size:
+                self.entries_.popitem(last=False)
+
+        return
+
+
+profile_versions = ProfileVersions()
+
+
+class AuthStubPool:
+    """
+    Lazily created pool of persistent gRPC channels to auth service.
+    Channels are recreated after fork, since gRPC channels must not be shared between processes.
+    """
+
+    def __init__(
+        self,
+        size: int = AUTH_GRPC_POOL_SIZE,
+    ) -> None:
+        self.size = max(size, 1)
+        self.pid_ = None
+        self.channels_: tp.List[grpc.Channel] = []
+        self.stubs_: tp.List[AuthStub] = []
+        self.counter_ = itertools.count()
+        self.lock_ = threading.Lock()
+        return
+
+    def _create(
+        self,
+    ) -> None:
+        auth_grpc = os.environ.get("AUTH_GRPC_HOST") + ":" + os.environ.get("AUTH_GRPC_PORT")
+
+        if self.pid_ == os.getpid():
+            for channel in self.channels_:
+                channel.close()
+
+        self.channels_ = [
+            grpc.insecure_channel(
+                target=auth_grpc,
+                options=AUTH_GRPC_OPTIONS,
+            )
+            for _ in range(self.size)
+        ]
+        self.stubs_ = [AuthStub(channel) for channel in self.channels_]
+        self.pid_ = os.getpid()
+
+    def stub(
+        self,
+    ) -> AuthStub:
+        if self.pid_ != os.getpid():
+            with self.lock_:
+                if self.pid_ != os.getpid():
+                    self._create()
+
+        return self.stubs_[next(self.counter_) % self.size]
+
+
+auth_stub_pool = AuthStubPool()
+
+
+class AsyncAuthStubPool(AuthStubPool):
+    """
+    Pool of `grpc.aio` channels for async views.
+    Channels belong to event loop they were created in, so every loop gets its own channels.
+    Calls can not be in progress in closed loop, so its channels are dropped when channels for new loop are created
+    (they reference their loop, so loop could not be a weak key).
+    """
+
+    def __init__(
+        self,
+        size: int = AUTH_GRPC_POOL_SIZE,
+    ) -> None:
+        super().__init__(size)
+        self.loops_: tp.Dict[asyncio.AbstractEventLoop, tp.List[AuthStub]] = {}
+        return
+
+    def _create(
+        self,
+    ) -> None:
+        auth_grpc = os.environ.get("AUTH_GRPC_HOST") + ":" + os.environ.get("AUTH_GRPC_PORT")
+
+        # channels of parent process are not ours
+        loops = self.loops_ if self.pid_ == os.getpid() else {}
+
+        channels = [
+            aio.insecure_channel(
+                target=auth_grpc,
+                options=AUTH_GRPC_OPTIONS,
+            )
+            for _ in range(self.size)
+        ]
+
+        self.loops_ = {
+            **{loop: stubs for loop, stubs in loops.items() if not loop.is_closed()},
+            asyncio.get_event_loop(): [AuthStub(channel) for channel in channels],
+        }
+        self.pid_ = os.getpid()
+
+    def stub(
+        self,
+    ) -> AuthStub:
+        loop = asyncio.get_event_loop()
+
+        stubs = self.loops_.get(loop) if self.pid_ == os.getpid() else None
+        if stubs is None:
+            with self.lock_:
+                if self.pid_ != os.getpid() or loop not in self.loops_:
+                    self._create()
+                stubs = self.loops_[loop]
+
+        return stubs[next(self.counter_) % self.size]
+
+
+async_auth_stub_pool = AsyncAuthStubPool()
+
+
+class JWKSVerifier:
+    """
+    Verifies tokens locally using public keys published by auth service.
+    Keys are fetched on first use and refetched every `refresh_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        url: str = AUTH_JWKS_URL,
+        refresh_interval: float = AUTH_JWKS_REFRESH,
+    ) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.keys_: tp.List[tp.Tuple[str, tp.Any]] = []
+        self.fetched_at_ = 0.0
+        self.lock_ = threading.Lock()
+        return
+
+    def _refresh(
+        self,
+    ) -> None:
+        with self.lock_:
+            if time.time() - self.fetched_at_ < self.refresh_interval:
+                return
+
+            # do not retry failed fetch on every request
+            self.fetched_at_ = time.time()
+
+            try:
+                with urllib.request.urlopen(self.url, timeout=AUTH_JWKS_TIMEOUT) as response:
+                    jwks = json.load(response)
+            except (OSError, ValueError) as e:
+                print(e)
+                return
+
+            self.keys_ = [
+                (jwk["alg"], RSAAlgorithm.from_jwk(json.dumps(jwk)))
+                for jwk in jwks.get("keys", [])
+                if jwk.get("kty") == "RSA"
+            ]
+
+        return
+
+    @property
+    def stale(
+        self,
+    ) -> bool:
+        return time.time() - self.fetched_at_ >= self.refresh_interval
+
+    def verify(
+        self,
+        token: str,
+    ) -> tp.Optional[Profile]:
+        """
+        Verify token signature and build profile from its claims.
+        :param token: encoded JWT.
+        :return: profile (from gRPC specification) or None if token can not be verified locally.
+        """
+
+        if self.stale:
+            self._refresh()
+
+        for algorithm, key in self.keys_:
+            try:
+                claims = jwt.decode(token, key, algorithms=[algorithm])
+            except jwt.ExpiredSignatureError:
+                return Profile(has_valid_token=False)
+            except jwt.InvalidTokenError:
+                continue
+
+            if ROLE_CLAIM not in claims or PROFILE_ID_CLAIM not in claims:
+                return None
+
+            return Profile(
+                has_valid_token=True,
+                id=claims[PROFILE_ID_CLAIM],
+                role=claims[ROLE_CLAIM],
+            )
+
+        return None
+
+
+jwks_verifier = JWKSVerifier()
+
+
+def get_token(
+    request: Request,
+) -> str:
+    return request.META.get("HTTP_AUTHORIZATION", "").split("Bearer ")[-1]
+
+
+def verify_locally(
+    token: str,
+) -> tp.Optional[Profile]:
+    """
+    Verify token without auth service: by cache of verified tokens or by signature,
+    the latter only if profile version in its claims is confirmed recently.
+    :param token: encoded JWT.
+    :return: profile (from gRPC specification) or None if token must be verified by auth service.
+    """
+
+    profile = verification_cache.get(token)
+    if profile is not None:
+        return profile
+
+    if not AUTH_STRICT_VERIFY:
+        profile = jwks_verifier.verify(token)
+        if profile is None:
+            return None
+
+        if not profile.has_valid_token:
+            return profile
+
+        if profile_versions.confirmed(unverified_claims(token)):
+            verification_cache.put(token, profile)
+            return profile
+
+    return None
+
+
+def verification_request(
+    token: str,
+) -> Token:
+    """
+    :param token: encoded JWT.
+    :return: request to auth service, strict if profile version in token claims is not confirmed recently.
+    """
+
+    return Token(
+        token=token,
+        strict=AUTH_STRICT_VERIFY or not profile_versions.confirmed(unverified_claims(token)),
+    )
+
+
+def remember_verified(
+    request: Token,
+    profile: Profile,
+) -> None:
+    """
+    Cache profile verified by auth service, profile version is confirmed if it was checked in database.
+    """
+
+    if not profile.has_valid_token:
+        return
+
+    if request.strict:
+        profile_versions.confirm(unverified_claims(request.token))
+
+    verification_cache.put(request.token, profile)
+
+
+def get_profile_by_token(
+    request: Request,
+) -> Profile:
+    """
+    Get profile associated with token from request.
+    Token is verified locally by its signature if possible, otherwise by auth service.
+    Only profiles with valid token are cached, invalid ones are always rechecked.
+    If auth service is unreachable within deadline, token is considered invalid.
+    :param request: request with token in header.
+    :return: profile (from gRPC specification).
+    """
+
+    token_from_request = get_token(request)
+
+    profile = verify_locally(token_from_request)
+    if profile is not None:
+        return profile
+
+    request_ = verification_request(token_from_request)
+
+    try:
+        profile = auth_stub_pool.stub().Verify(
+            request_,
+            timeout=AUTH_GRPC_TIMEOUT,
+        )
+    except grpc.RpcError as e:
+        print(e)
+        return Profile(has_valid_token=False)
+
+    remember_verified(request_, profile)
+
+    return profile
+
+
+async def async_get_profile_by_token(
+    request: Request,
+) -> Profile:
+    """
+    The same as `get_profile_by_token`, but event loop is not blocked while auth service is called
+    or public keys are fetched.
+    :param request: request with token in header.
+    :return: profile (from gRPC specification).
+    """
+
+    token_from_request = get_token(request)
+
+    if not AUTH_STRICT_VERIFY and jwks_verifier.stale:
+        await sync_to_async(jwks_verifier._refresh, thread_sensitive=False)()
+
+    profile = verify_locally(token_from_request)
+    if profile is not None:
+        return profile
+
+    request_ = verification_request(token_from_request)
+
+    try:
+        profile = await async_auth_stub_pool.stub().Verify(
+            request_,
+            timeout=AUTH_GRPC_TIMEOUT,
+        )
+    except grpc.RpcError as e:
+        print(e)
+        return Profile(has_valid_token=False)
+
+    remember_verified(request_, profile)
+
+    return profile
@@ -0,0 +1,68 @@
+# coding=utf-8
+
+import os
+
+import typing as tp
+
+import redis
+
+
+# products are cached by online-store, import only invalidates them
+PRODUCT_CACHE_DB = int(os.environ.get("PRODUCT_CACHE_DB", 1))
+
+
+class ProductCache:
+    """
+    Invalidates products cached by online-store in Redis.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "product:",
+    ) -> None:
+        self.prefix = prefix
+        self.redis_ = None
+        return
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self.redis_ is None:
+            self.redis_ = redis.Redis(
+                host=os.environ.get("REDIS_HOST"),
+                port=os.environ.get("REDIS_PORT"),
+                db=PRODUCT_CACHE_DB,
+                socket_timeout=1,
+            )
+        return self.redis_
+
+    def invalidate(
+        self,
+        ids: tp.Iterable[str],
+    ) -> None:
+        keys = [
+            key
+            for id_ in ids
+            for key in (self.prefix + id_, self.prefix + id_ + ":lock")
+        ]
+        if not keys:
+            return
+
+        try:
+            self.redis.delete(*keys)
+        except redis.RedisError as e:
+            print(f"failed to invalidate product cache: {e!r}")
+
+    def bump_catalogue_version(
+        self,
+    ) -> None:
+        """
+        Cached product list pages of online-store are outdated after import.
+        """
+
+        try:
+            self.redis.incr("catalogue:version")
+        except redis.RedisError as e:
+            print(f"failed to bump catalogue version: {e!r}")
+
+
+product_cache = ProductCache()
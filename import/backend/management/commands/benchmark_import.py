@@ -0,0 +1,95 @@
+# coding=utf-8
+
+import time
+import random
+import hashlib
+
+import typing as tp
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.models import Product
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+def generate_products(
+    rows: int,
+) -> tp.List[tp.Dict[str, str]]:
+    products = []
+    for index in range(rows):
+        title = f"product {index} {random.random()}"
+        category = f"Category {index % 50} > Subcategory {index % 7}"
+        products.append({
+            "id":       hashlib.blake2s(f"{title}{category}".encode()).hexdigest(),
+            "title":    title,
+            "category": category,
+        })
+
+    return products
+
+
+def insert_per_row(
+    products: tp.List[tp.Dict[str, str]],
+) -> tp.Tuple[int, int]:
+    """
+    Former import path: `get_or_create` for every product.
+    """
+
+    inserted = 0
+    for product in products:
+        _, created = Product.objects.get_or_create(
+            id=product["id"],
+            title=product["title"],
+            category=product["category"],
+        )
+        inserted += created
+
+    return inserted, 0
+
+
+class Command(BaseCommand):
+    help = "Compare import throughput of per-row, batched INSERT and COPY paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--chunk-size", type=int, default=512)
+        parser.add_argument("--skip-per-row", action="store_true")
+
+    def run(
+        self,
+        insert: tp.Callable[[tp.List[tp.Dict[str, str]]], tp.Tuple[int, int]],
+        products: tp.List[tp.Dict[str, str]],
+        chunk_size: int,
+    ) -> float:
+        started = time.perf_counter()
+
+        try:
+            # every path starts from the same table state
+            with transaction.atomic():
+                for start in range(0, len(products), chunk_size):
+                    insert(products[start:start + chunk_size])
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        products = generate_products(options["rows"])
+
+        paths = {
+            "per-row get_or_create": insert_per_row,
+            "INSERT ... ON CONFLICT": Product.upsert,
+            "COPY + merge":           Product.copy_upsert,
+        }
+        if options["skip_per_row"]:
+            del paths["per-row get_or_create"]
+
+        self.stdout.write(f"{len(products)} products in chunks of {options['chunk_size']}")
+        for name, insert in paths.items():
+            elapsed = self.run(insert, products, options["chunk_size"])
+            self.stdout.write(f"{name:<24}{elapsed:>10.2f} s{len(products) / elapsed:>12.0f} rows/s")
@@ -0,0 +1,86 @@
+# coding=utf-8
+
+import os
+import time
+import multiprocessing
+
+import pika
+
+from django.core.management.base import BaseCommand
+from django.db import (
+    InterfaceError,
+    OperationalError,
+    connection,
+    connections,
+)
+
+from backend.mq import MessageQueueConsumer
+from backend.tasks import import_chunk
+
+
+def handle_chunk(
+    properties: pika.BasicProperties,
+    body: bytes,
+    last_attempt: bool,
+) -> None:
+    try:
+        import_chunk(properties, body, last_attempt)
+    except (InterfaceError, OperationalError):
+        # connection is kept between chunks, the one broken by database restart or idle timeout
+        # is replaced for the next chunk instead of failing every chunk
+        connection.close()
+        raise
+
+
+def consume(
+    prefetch_count: int,
+) -> None:
+    consumer = MessageQueueConsumer(
+        prefetch_count=prefetch_count,
+    )
+    consumer.consume(handle_chunk)
+
+
+class Command(BaseCommand):
+    help = "Import ready chunks from message queue as they arrive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--consumers",
+            type=int,
+            default=int(os.environ.get("IMPORT_CONSUMERS", 4)),
+            help="number of consumer processes",
+        )
+        parser.add_argument(
+            "--prefetch",
+            type=int,
+            default=int(os.environ.get("IMPORT_PREFETCH_COUNT", 2)),
+            help="number of unacknowledged chunks per consumer",
+        )
+
+    def handle(self, *args, **options):
+        if options["consumers"] <= 1:
+            consume(options["prefetch"])
+            return
+
+        # database connections must not be shared with forked processes
+        connections.close_all()
+
+        def start() -> multiprocessing.Process:
+            process = multiprocessing.Process(
+                target=consume,
+                args=(options["prefetch"],),
+                daemon=True,
+            )
+            process.start()
+            return process
+
+        processes = [start() for _ in range(options["consumers"])]
+
+        # unacknowledged chunks of crashed consumer are redelivered by broker, just replace it
+        while True:
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"consumer {process.pid} exited with code {process.exitcode}, restarting")
+                    processes[index] = start()
+            time.sleep(1)
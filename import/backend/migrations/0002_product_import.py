@@ -0,0 +1,26 @@
+# Generated by Django 3.0.7 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.TextField(primary_key=True, serialize=False)),
+                ('title', models.TextField()),
+                ('category', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Product',
+                'verbose_name_plural': 'Products',
+                'managed': False,
+            },
+        ),
+    ]
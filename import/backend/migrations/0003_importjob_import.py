@@ -0,0 +1,42 @@
+# Generated by Django 3.0.7 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_product_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.IntegerField()),
+                ('file_hash', models.CharField(max_length=128)),
+                ('format', models.CharField(max_length=8)),
+                ('status', models.CharField(max_length=16)),
+                ('chunks_total', models.IntegerField()),
+                ('chunks_done', models.IntegerField()),
+                ('chunks_failed', models.IntegerField()),
+                ('rows_total', models.IntegerField()),
+                ('rows_done', models.IntegerField()),
+                ('rows_inserted', models.IntegerField()),
+                ('rows_updated', models.IntegerField()),
+                ('read_seconds', models.FloatField()),
+                ('publish_seconds', models.FloatField()),
+                ('parse_seconds', models.FloatField()),
+                ('insert_seconds', models.FloatField()),
+                ('created_at', models.DateTimeField()),
+                ('parsed_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Import job',
+                'verbose_name_plural': 'Import jobs',
+                'managed': False,
+            },
+        ),
+    ]
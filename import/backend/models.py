@@ -1,17 +1,43 @@
 # coding=utf-8
 
+import io
+import csv
 import hashlib
 
-from django.db import models
+import typing as tp
+
+from django.db import (
+    connection,
+    models,
+    transaction,
+)
+from django.db.models import (
+    Case,
+    F,
+    Value,
+    When,
+)
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+
+# chunk of products is either list of rows or dict of "id", "title" and "category" columns
+Chunk = tp.Union[tp.List[tp.Dict[str, str]], tp.Dict[str, tp.List[str]]]
+
+
+def chunk_length(products: Chunk) -> int:
+    return len(products["id"]) if isinstance(products, dict) else len(products)
 
 
 class Product(models.Model):
-    id = models.TextField(
+    id = models.CharField(
         primary_key=True,
+        max_length=64,  # blake2s hex digest
     )
     title = models.TextField(
     )
     category = models.TextField(
+        db_index=True,
     )
 
     @staticmethod
@@ -40,6 +66,109 @@ class Product(models.Model):
 
         return product.id
 
+    @staticmethod
+    def _complete_rows(
+        products: Chunk,
+    ) -> tp.List[tp.Tuple[str, str, str]]:
+        """
+        Skip incomplete products and leave only last occurrence of each id,
+        since the same row can not be affected twice by one `ON CONFLICT DO UPDATE`.
+        """
+
+        if isinstance(products, dict):
+            # columns are already validated by reader
+            return list({
+                row[0]: row
+                for row in zip(products["id"], products["title"], products["category"])
+            }.values())
+
+        return list({
+            product["id"]: (product["id"], product["title"], product["category"])
+            for product in products
+            if product.get("id") and product.get("title") and product.get("category") is not None
+        }.values())
+
+    @staticmethod
+    def upsert(
+        products: Chunk,
+    ) -> tp.Tuple[int, int]:
+        """
+        Insert new products and update changed ones with single statement.
+        :param products: rows with "id", "title" and "category" keys, incomplete ones are skipped, or columns.
+        :return: number of inserted and updated products.
+        """
+
+        rows = Product._complete_rows(products)
+        if not rows:
+            return 0, 0
+
+        table = connection.ops.quote_name(Product._meta.db_table)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            results = execute_values(
+                cur=cursor.cursor,
+                sql=f"""
+                    INSERT INTO {table} (id, title, category) VALUES %s
+                    ON CONFLICT (id) DO UPDATE
+                    SET title = EXCLUDED.title, category = EXCLUDED.category
+                    WHERE ({table}.title, {table}.category) IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.category)
+                    RETURNING xmax = 0
+                """,
+                argslist=rows,
+                page_size=len(rows),
+                fetch=True,
+            )
+
+        inserted = sum(1 for (is_inserted,) in results if is_inserted)
+
+        return inserted, len(results) - inserted
+
+    @staticmethod
+    def copy_upsert(
+        products: Chunk,
+    ) -> tp.Tuple[int, int]:
+        """
+        Same as `upsert`, but rows are streamed with `COPY` into temporary staging table
+        (not written to WAL) and merged from there, which is much faster for large batches.
+        :param products: rows with "id", "title" and "category" keys, incomplete ones are skipped, or columns.
+        :return: number of inserted and updated products.
+        """
+
+        rows = Product._complete_rows(products)
+        if not rows:
+            return 0, 0
+
+        table = connection.ops.quote_name(Product._meta.db_table)
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS product_staging "
+                "(id text, title text, category text) ON COMMIT DELETE ROWS"
+            )
+            cursor.execute("TRUNCATE product_staging")
+            cursor.cursor.copy_expert(
+                sql="COPY product_staging (id, title, category) FROM STDIN "
+                    "WITH (FORMAT csv, FORCE_NOT_NULL (id, title, category))",
+                file=buffer,
+            )
+            cursor.execute(f"""
+                INSERT INTO {table} (id, title, category)
+                SELECT id, title, category FROM product_staging
+                ON CONFLICT (id) DO UPDATE
+                SET title = EXCLUDED.title, category = EXCLUDED.category
+                WHERE ({table}.title, {table}.category) IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.category)
+                RETURNING xmax = 0
+            """)
+            results = cursor.fetchall()
+
+        inserted = sum(1 for (is_inserted,) in results if is_inserted)
+
+        return inserted, len(results) - inserted
+
     @staticmethod
     def delete_by_id(
         id_: str,
@@ -52,9 +181,168 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        # table and its indexes are owned by online-store migrations
+        managed = False
 
 
     def __str__(
         self
     ) -> str:
         return self.title
+
+
+class ImportJob(models.Model):
+    """
+    Progress of import of uploaded file, consumers record parse and insert stages of every chunk.
+    """
+
+    PARSING = "parsing"
+    IMPORTING = "importing"
+    DONE = "done"
+    FAILED = "failed"
+
+    owner = models.IntegerField(
+    )
+    file_hash = models.CharField(
+        max_length=128,
+    )
+    format = models.CharField(
+        max_length=8,
+    )
+    status = models.CharField(
+        max_length=16,
+    )
+
+    chunks_total = models.IntegerField()
+    chunks_done = models.IntegerField()
+    chunks_failed = models.IntegerField()
+    rows_total = models.IntegerField()
+    rows_done = models.IntegerField()
+    rows_inserted = models.IntegerField()
+    rows_updated = models.IntegerField()
+
+    read_seconds = models.FloatField()
+    publish_seconds = models.FloatField()
+    parse_seconds = models.FloatField()
+    insert_seconds = models.FloatField()
+
+    created_at = models.DateTimeField(
+    )
+    parsed_at = models.DateTimeField(
+        null=True,
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+    )
+
+    @staticmethod
+    def chunk_done(
+        id_: int,
+        key: tp.Optional[str],
+        rows: int,
+        inserted: int,
+        updated: int,
+        parse_seconds: float,
+        insert_seconds: float,
+    ) -> None:
+        """
+        Count imported chunk, chunk with the same key is counted once.
+        """
+
+        with transaction.atomic():
+            if not ImportChunk.record(id_, key):
+                return
+
+            ImportJob.objects.filter(id=id_).update(
+                chunks_done=F("chunks_done") + 1,
+                rows_done=F("rows_done") + rows,
+                rows_inserted=F("rows_inserted") + inserted,
+                rows_updated=F("rows_updated") + updated,
+                parse_seconds=F("parse_seconds") + parse_seconds,
+                insert_seconds=F("insert_seconds") + insert_seconds,
+            )
+        ImportJob.finish_if_complete(id_)
+
+    @staticmethod
+    def chunk_failed(
+        id_: int,
+        key: tp.Optional[str],
+    ) -> None:
+        """
+        Count failed chunk, chunk with the same key is counted once.
+        """
+
+        with transaction.atomic():
+            if not ImportChunk.record(id_, key):
+                return
+
+            ImportJob.objects.filter(id=id_).update(
+                chunks_failed=F("chunks_failed") + 1,
+            )
+        ImportJob.finish_if_complete(id_)
+
+    @staticmethod
+    def finish_if_complete(
+        id_: int,
+    ) -> None:
+        ImportJob.objects.filter(
+            id=id_,
+            status=ImportJob.IMPORTING,
+            chunks_total__lte=F("chunks_done") + F("chunks_failed"),
+        ).update(
+            status=Case(
+                When(chunks_failed__gt=0, then=Value(ImportJob.FAILED)),
+                default=Value(ImportJob.DONE),
+            ),
+            finished_at=timezone.now(),
+        )
+
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+        # table is owned by upload migrations
+        managed = False
+
+
+class ImportChunk(models.Model):
+    """
+    Chunk of import job which is already counted as done or failed.
+    """
+
+    job = models.ForeignKey(
+        ImportJob,
+        on_delete=models.CASCADE,
+    )
+    key = models.CharField(
+        max_length=255,
+    )
+
+    @staticmethod
+    def record(
+        job_id: int,
+        key: tp.Optional[str],
+    ) -> bool:
+        """
+        :param job_id: import job of chunk.
+        :param key: chunk key unique within job, chunks of older messages have none.
+        :return: whether chunk is recorded now, `False` if it was recorded before.
+        """
+
+        if key is None:
+            return True
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {ImportChunk._meta.db_table} (job_id, key) VALUES (%s, %s) "
+                f"ON CONFLICT (job_id, key) DO NOTHING",
+                [job_id, key],
+            )
+            return cursor.rowcount == 1
+
+    class Meta:
+        verbose_name = "Import chunk"
+        verbose_name_plural = "Import chunks"
+        unique_together = [("job", "key")]
+        # table is owned by upload migrations
+        managed = False
@@ -3,21 +3,64 @@
 import os
 import pika
 import json
+import time
+import zlib
+
+import typing as tp
+
+from pika.exceptions import AMQPError
+
+from backend.models import Chunk
+
+
+# chunk which fails that many times is parked
+MAX_ATTEMPTS = int(os.environ.get("IMPORT_MAX_ATTEMPTS", 2))
+ATTEMPTS_HEADER = "x-attempts"
+
+
+def decode_chunk(
+    properties: pika.BasicProperties,
+    body: bytes,
+) -> tp.Tuple[Chunk, str, tp.Optional[int], tp.Optional[str]]:
+    """
+    Decode chunk sent either inside message or through file.
+    :param properties: message properties.
+    :param body: message body.
+    :return: products (rows or columns) from message, path to chunk file, import job id and chunk key within job.
+    """
+
+    if properties.content_encoding == "deflate":
+        body = zlib.decompress(body)
+
+    message = json.loads(body)
+
+    return (
+        message.get("columns") or message.get("products", []),
+        message.get("path", ""),
+        message.get("job"),
+        message.get("chunk"),
+    )
 
 
 class MessageQueueConsumer:
     """
-    Provides messages to RabbitMQ.
+    Consumes ready chunks from RabbitMQ.
     """
 
     def __init__(
         self,
+        prefetch_count: int = 1,
     ) -> None:
+        self.prefetch_count = prefetch_count
         self.connection = None
         self.channel = None
         return
 
     def _restore_connection(self):
+        if self.connection is not None and self.connection.is_open:
+            # e.g. retried or parked chunk was not confirmed, unacknowledged messages are redelivered
+            self.connection.close()
+
         self.connection = pika.BlockingConnection(
             parameters=pika.ConnectionParameters(
                 host=os.environ.get("MQ_HOST"),
@@ -26,21 +69,99 @@ class MessageQueueConsumer:
             )
         )
         self.channel = self.connection.channel()
+        self.channel.basic_qos(prefetch_count=self.prefetch_count)
+        # failed chunks are retried or parked only once broker confirms them
+        self.channel.confirm_delivery()
 
-    def get_path_to_ready_chunk(
+    def retry(
         self,
-        queue: str = os.environ.get("IMPORT_QUEUE")
-    ) -> str:
-        if not self.connection or self.connection.is_closed:
-            self._restore_connection()
+        queue: str,
+        properties: pika.BasicProperties,
+        body: bytes,
+        attempts: int,
+    ) -> None:
+        """
+        Republish failed chunk to the end of import queue with number of failed attempts.
+        Unlike `redelivered` flag, which is also set for chunks of crashed consumer, the header counts failures only.
+        :param queue: import queue.
+        :param properties: properties of failed message.
+        :param body: body of failed message.
+        :param attempts: number of failed attempts.
+        """
+
+        properties.headers = {**(properties.headers or {}), ATTEMPTS_HEADER: attempts}
+
+        self.channel.basic_publish(
+            exchange="",
+            routing_key=queue,
+            body=body,
+            properties=properties,
+        )
+
+    def park(
+        self,
+        queue: str,
+        properties: pika.BasicProperties,
+        body: bytes,
+        error: Exception,
+    ) -> None:
+        """
+        Move chunk which could not be imported to parking queue, so it is kept for inspection or replay.
+        :param queue: parking queue.
+        :param properties: properties of failed message.
+        :param body: body of failed message.
+        :param error: why chunk failed.
+        """
+
+        properties.headers = {**(properties.headers or {}), "x-error": repr(error)[:1024]}
+
+        self.channel.basic_publish(
+            exchange="",
+            routing_key=queue,
+            body=body,
+            properties=properties,
+        )
+
+    def consume(
+        self,
+        handle_chunk: tp.Callable[[pika.BasicProperties, bytes, bool], None],
+        queue: str = os.environ.get("IMPORT_QUEUE"),
+        reconnect_delay: float = 2,
+    ) -> None:
+        """
+        Process chunks as they arrive, message is acknowledged only after it is handled.
+        Failed message is republished until it fails `MAX_ATTEMPTS` times, then moved to `<queue>.failed`.
+        :param handle_chunk: callback with message properties, body and whether it is the last attempt.
+        :param queue: import queue.
+        :param reconnect_delay: seconds to wait before reconnecting to broker.
+        """
 
-        method_frame, header_frame, body = self.channel.basic_get(queue)
-        if not method_frame:
-            return ""
+        failed_queue = f"{queue}.failed"
 
-        self.channel.basic_ack(method_frame.delivery_tag)
+        def on_message(channel, method, properties, body):
+            attempts = (properties.headers or {}).get(ATTEMPTS_HEADER, 0) + 1
+            try:
+                handle_chunk(properties, body, attempts >= MAX_ATTEMPTS)
+            except Exception as e:
+                print(f"failed to import chunk: {e!r}")
+                # if publishing fails, message stays unacknowledged and is redelivered after reconnect
+                if attempts < MAX_ATTEMPTS:
+                    self.retry(queue, properties, body, attempts)
+                else:
+                    self.park(failed_queue, properties, body, e)
 
-        path = json.loads(body)["path"]
-        print(f"received from broker: {path = }")
+            channel.basic_ack(method.delivery_tag)
 
-        return path
+        while True:
+            try:
+                self._restore_connection()
+                self.channel.queue_declare(queue)
+                self.channel.queue_declare(failed_queue)
+                self.channel.basic_consume(
+                    queue=queue,
+                    on_message_callback=on_message,
+                )
+                self.channel.start_consuming()
+            except AMQPError as e:
+                print(f"lost connection to broker: {e!r}")
+                time.sleep(reconnect_delay)
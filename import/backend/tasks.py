@@ -1,59 +1,88 @@
 # coding=utf-8
 
 import json
-import time
 import os
+import time
 import typing as tp
 
-from django_q.tasks import async_task
+import pika
+
+from backend.cache import product_cache
+from backend.models import (
+    Chunk,
+    ImportJob,
+    Product,
+    chunk_length,
+)
+from backend.mq import decode_chunk
+
 
-from backend.models import Product
-from backend.mq import MessageQueueConsumer
+# chunks with at least that many products are loaded with `COPY` instead of `INSERT`,
+# below it batched `INSERT` is faster; `.csv` chunks (`IMPORT_COLUMNAR_CHUNK_SIZE`) are above it
+COPY_THRESHOLD = int(os.environ.get("IMPORT_COPY_THRESHOLD", 2048))
 
 
-DELAY = 0  # seconds
+def insert_chunk(products: Chunk) -> tp.Tuple[int, int]:
+    length = chunk_length(products)
+    if not length:
+        return 0, 0
 
+    upsert = Product.copy_upsert if length >= COPY_THRESHOLD else Product.upsert
+    inserted, updated = upsert(products)
+    print(f"chunk of {length} products: {inserted = }, {updated = }")
 
-def insert_chunk(products: tp.List[tp.Dict[str, str]]) -> None:
-    for product in products:
-        product_db, created = Product.objects.get_or_create(
-            id=product["id"],
-            title=product["title"],
-            category=product["category"],
+    # after commit, so that cache is not filled with old rows again
+    if inserted or updated:
+        product_cache.invalidate(
+            products["id"] if isinstance(products, dict)
+            else (product["id"] for product in products if product.get("id"))
         )
-        if created:
-            product_db.save()
+        product_cache.bump_catalogue_version()
 
-    async_task(schedule_import_chunk)
+    return inserted, updated
 
 
-def parse_chunk(path: str) -> None:
+def parse_chunk(path: str) -> Chunk:
     chunk = []
 
     if os.path.exists(path):
         with open(path) as file:
             chunk = json.load(file)
 
-    async_task(insert_chunk, chunk)
-
-
-def import_chunk():
-    global DELAY
-
-    mq_consumer = MessageQueueConsumer()
-
-    path = mq_consumer.get_path_to_ready_chunk()
-    if path:
-        DELAY = 0
-    else:
-        DELAY = 2
-
-    async_task(parse_chunk, path)
-
-
-def schedule_import_chunk():
-    async_task(import_chunk)
-    time.sleep(DELAY)
-
-
-async_task(schedule_import_chunk)
+    return chunk
+
+
+def import_chunk(
+    properties: pika.BasicProperties,
+    body: bytes,
+    last_attempt: bool = True,
+) -> None:
+    """
+    Insert chunk sent either inside message or through file, returns after transaction is committed.
+    Parse and insert time is recorded in import job of chunk.
+    """
+
+    job_id = None
+    key = None
+    try:
+        started = time.perf_counter()
+        products, path, job_id, key = decode_chunk(properties, body)
+        if path:
+            products = parse_chunk(path)
+        parse_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        inserted, updated = insert_chunk(products)
+        insert_seconds = time.perf_counter() - started
+    except Exception:
+        # failed chunk is retried, after the last attempt it is parked and counted as failed for the job
+        if last_attempt and job_id is not None:
+            ImportJob.chunk_failed(job_id, key)
+        raise
+
+    if job_id is not None:
+        ImportJob.chunk_done(job_id, key, chunk_length(products), inserted, updated, parse_seconds, insert_seconds)
+
+    # chunk file is not needed anymore once products are in database
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -16,8 +16,6 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-# side-effect: tasks scheduling
-import backend.tasks
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -0,0 +1,349 @@
+# coding=utf-8
+
+import os
+import time
+import threading
+
+import typing as tp
+
+from collections import deque
+
+import pika
+
+from pika.adapters.select_connection import IOLoop
+from pika.exceptions import AMQPError
+
+
+MAX_UNCONFIRMED = 256
+CONFIRM_TIMEOUT = 30  # seconds
+RECONNECT_DELAY = 0.5  # seconds, doubled on every failed attempt
+MAX_RECONNECT_DELAY = 30  # seconds
+
+# guards start of I/O thread in every process
+start_lock = threading.Lock()
+
+
+class ConfirmationTimeout(AMQPError):
+    """
+    Broker has not confirmed published messages in time, they may be lost.
+    """
+
+
+class Delivery:
+    """
+    Message queued by `Publisher`, tracks whether broker has confirmed it.
+    """
+
+    def __init__(
+        self,
+        queue: str,
+        body: bytes,
+        properties: tp.Optional[pika.BasicProperties],
+    ) -> None:
+        self.queue = queue
+        self.body = body
+        self.properties = properties
+        self.confirmed = False
+        return
+
+
+class Publisher:
+    """
+    Publishes messages to RabbitMQ over long-lived channel with publisher confirms,
+    shared by services which send messages (`auth`, `upload`).
+    Connection is served by its own I/O thread, so publishing does not wait for broker:
+    messages are queued and confirmations are tracked asynchronously. Messages nacked by broker
+    or left unconfirmed by lost connection are republished after reconnect.
+    """
+
+    def __init__(
+        self,
+        max_unconfirmed: int = MAX_UNCONFIRMED,
+    ) -> None:
+        self.max_unconfirmed = max_unconfirmed
+        self.ioloop_ = None
+        self.connection_ = None
+        self.channel_ = None
+        self.pid_ = None
+        self.declared_queues_: tp.Set[str] = set()
+        self.declaring_ = False
+        self.delivery_tag_ = 0
+        self.reconnect_delay_ = RECONNECT_DELAY
+        self.outbox_: tp.Deque[Delivery] = deque()
+        self.unconfirmed_: tp.Dict[int, Delivery] = {}
+        self.condition_ = threading.Condition()
+        return
+
+    def _start(
+        self,
+    ) -> None:
+        """
+        Start I/O thread of this process, connection and messages of parent process are not ours.
+        """
+
+        if self.pid_ == os.getpid():
+            return
+
+        with start_lock:
+            if self.pid_ == os.getpid():
+                return
+
+            # lock might be held by thread which does not exist after fork
+            self.condition_ = threading.Condition()
+            self.connection_ = None
+            self.channel_ = None
+            self.outbox_.clear()
+            self.unconfirmed_.clear()
+
+            self.ioloop_ = IOLoop()
+            self.ioloop_.add_callback_threadsafe(self._connect)
+            threading.Thread(target=self.ioloop_.start, name="publisher", daemon=True).start()
+            self.pid_ = os.getpid()
+
+    def _connect(
+        self,
+    ) -> None:
+        self.connection_ = pika.SelectConnection(
+            parameters=pika.ConnectionParameters(
+                host=os.environ.get("MQ_HOST"),
+                port=int(os.environ.get("MQ_PORT")),
+            ),
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=self.ioloop_,
+        )
+
+    def _reconnect_later(
+        self,
+    ) -> None:
+        self.ioloop_.call_later(self.reconnect_delay_, self._connect)
+        self.reconnect_delay_ = min(self.reconnect_delay_ * 2, MAX_RECONNECT_DELAY)
+
+    def _on_connection_open(
+        self,
+        connection: pika.SelectConnection,
+    ) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(
+        self,
+        connection: pika.SelectConnection,
+        error: Exception,
+    ) -> None:
+        print(f"failed to connect to broker: {error!r}")
+        self._reconnect_later()
+
+    def _on_connection_closed(
+        self,
+        connection: pika.SelectConnection,
+        reason: Exception,
+    ) -> None:
+        print(f"lost connection to broker: {reason!r}")
+
+        with self.condition_:
+            self.channel_ = None
+            # unconfirmed messages are republished after reconnect
+            self.outbox_.extendleft(reversed(list(self.unconfirmed_.values())))
+            self.unconfirmed_.clear()
+
+        self._reconnect_later()
+
+    def _on_channel_open(
+        self,
+        channel: pika.channel.Channel,
+    ) -> None:
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            ack_nack_callback=self._on_confirmation,
+            callback=lambda frame: self._on_channel_ready(channel),
+        )
+
+    def _on_channel_closed(
+        self,
+        channel: pika.channel.Channel,
+        reason: Exception,
+    ) -> None:
+        with self.condition_:
+            self.channel_ = None
+
+        # e.g. declaration was refused by broker, channel is reopened with new connection
+        if self.connection_.is_open:
+            self.connection_.close()
+
+    def _on_channel_ready(
+        self,
+        channel: pika.channel.Channel,
+    ) -> None:
+        with self.condition_:
+            self.channel_ = channel
+            self.declared_queues_.clear()
+            self.declaring_ = False
+            self.delivery_tag_ = 0
+            self.reconnect_delay_ = RECONNECT_DELAY
+
+        self._flush()
+
+    def _on_queue_declared(
+        self,
+        queue: str,
+    ) -> None:
+        with self.condition_:
+            self.declared_queues_.add(queue)
+            self.declaring_ = False
+
+        self._flush()
+
+    def _on_confirmation(
+        self,
+        frame,
+    ) -> None:
+        method = frame.method
+
+        with self.condition_:
+            if method.multiple:
+                tags = [tag for tag in self.unconfirmed_ if tag <= method.delivery_tag]
+            else:
+                tags = [method.delivery_tag]
+
+            for tag in tags:
+                delivery = self.unconfirmed_.pop(tag, None)
+                if delivery is None:
+                    continue
+                if isinstance(method, pika.spec.Basic.Nack):
+                    self.outbox_.append(delivery)
+                else:
+                    delivery.confirmed = True
+
+            self.condition_.notify_all()
+
+        if isinstance(method, pika.spec.Basic.Nack):
+            self._flush()
+
+    def _flush(
+        self,
+    ) -> None:
+        """
+        Publish pending messages in order without waiting for confirmations, runs in I/O thread.
+        """
+
+        with self.condition_:
+            while self.channel_ is not None and self.outbox_ and not self.declaring_:
+                delivery = self.outbox_[0]
+                queue = delivery.queue
+
+                if queue not in self.declared_queues_:
+                    # the rest is published once queue exists
+                    self.declaring_ = True
+                    self.channel_.queue_declare(queue, callback=lambda frame: self._on_queue_declared(queue))
+                    return
+
+                self.channel_.basic_publish(
+                    exchange="",
+                    routing_key=queue,
+                    body=delivery.body,
+                    properties=delivery.properties,
+                )
+                self.delivery_tag_ += 1
+                self.unconfirmed_[self.delivery_tag_] = self.outbox_.popleft()
+
+    def publish(
+        self,
+        queue: str,
+        body: bytes,
+        properties: tp.Optional[pika.BasicProperties] = None,
+        timeout: float = CONFIRM_TIMEOUT,
+    ) -> Delivery:
+        """
+        Queue message for publishing, waits only if too many messages are not confirmed yet.
+        :param queue: queue name, queue is declared on first use.
+        :param body: message body.
+        :param properties: message properties.
+        :param timeout: seconds to wait for confirmations when limit of unconfirmed messages is reached.
+        :return: queued message, its confirmation can be waited for.
+        """
+
+        self._start()
+
+        deadline = time.monotonic() + timeout
+
+        with self.condition_:
+            while len(self.outbox_) + len(self.unconfirmed_) >= self.max_unconfirmed:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise ConfirmationTimeout(f"{len(self.unconfirmed_)} messages are not confirmed by broker")
+                self.condition_.wait(left)
+
+            delivery = Delivery(queue, body, properties)
+            self.outbox_.append(delivery)
+
+        self.ioloop_.add_callback_threadsafe(self._flush)
+
+        return delivery
+
+    def wait_for_confirm(
+        self,
+        delivery: Delivery,
+        timeout: float = CONFIRM_TIMEOUT,
+    ) -> bool:
+        """
+        Wait until broker confirms one message, other messages are not waited for.
+        :param delivery: message returned by `publish`.
+        :param timeout: seconds to wait.
+        :return: whether message is confirmed.
+        """
+
+        deadline = time.monotonic() + timeout
+
+        with self.condition_:
+            while not delivery.confirmed:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self.condition_.wait(left)
+
+        return True
+
+    def withdraw(
+        self,
+        delivery: Delivery,
+    ) -> bool:
+        """
+        Drop message which has not been handed to broker yet, so it is never published.
+        Message which is already sent over open connection can not be withdrawn, it is delivered
+        (or republished after nack or reconnect) as usual.
+        :param delivery: message returned by `publish`.
+        :return: whether message is withdrawn.
+        """
+
+        with self.condition_:
+            if delivery not in self.outbox_:
+                return False
+
+            self.outbox_.remove(delivery)
+            self.condition_.notify_all()
+
+        return True
+
+    def wait_for_confirms(
+        self,
+        timeout: float = CONFIRM_TIMEOUT,
+    ) -> bool:
+        """
+        Wait until broker confirms all published messages.
+        :param timeout: seconds to wait.
+        :return: whether everything is confirmed.
+        """
+
+        self._start()
+
+        deadline = time.monotonic() + timeout
+
+        with self.condition_:
+            while self.outbox_ or self.unconfirmed_:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self.condition_.wait(left)
+
+        return True
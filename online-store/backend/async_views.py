@@ -0,0 +1,204 @@
+# coding=utf-8
+
+import typing as tp
+
+from asgiref.sync import sync_to_async
+
+from django.db import close_old_connections
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+)
+from django.utils.cache import patch_vary_headers
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+)
+from rest_framework.views import APIView
+
+from auth_client.verification import async_get_profile_by_token
+
+from api.proto.auth_pb2 import Profile
+
+from backend.cache import catalogue_cache
+from backend.models import Product
+from backend.serializers import ProductSerializer
+from backend.views import (
+    INVALID_CREDENTIALS,
+    MULTI_GET_MAX_IDS,
+    PRODUCT_NOT_FOUND,
+    TOO_MANY_IDS,
+    ListProductView,
+    ProductView,
+)
+
+
+def database_sync_to_async(
+    func: tp.Callable,
+) -> tp.Callable:
+    """
+    Run function which uses database (or Redis) in thread pool, there is no async ORM in Django 3.0.
+    Connections of pool threads are closed or kept (`CONN_MAX_AGE`) like after sync request.
+    """
+
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+def render(
+    data: tp.Any,
+    status: int,
+) -> HttpResponse:
+    """
+    Render data as DRF views do, requests served by async views do not pass through DRF.
+    """
+
+    return HttpResponse(
+        content=JSONRenderer().render(data) if data is not None else b"",
+        content_type="application/json",
+        status=status,
+    )
+
+
+def render_response(
+    response: Response,
+) -> HttpResponse:
+    return render(response.data, response.status_code)
+
+
+class AsyncView:
+    """
+    Async variant of DRF view, its responses get the same headers as responses of `sync_view`.
+    """
+
+    sync_view: tp.Type[APIView]
+
+    def finalize(
+        self,
+        response: HttpResponse,
+    ) -> HttpResponse:
+        view = self.sync_view()
+        # `as_view` serves HEAD by `get`
+        view.head = view.get
+
+        # set by DRF, and by session middleware since DRF session authentication reads session of every request
+        patch_vary_headers(response, ("Accept", "Cookie"))
+        response["Allow"] = ", ".join(view.allowed_methods)
+        return response
+
+
+class AsyncProductView(AsyncView):
+    """
+    Async variant of `ProductView.get`: event loop keeps serving other requests
+    while auth service and database are waited for.
+    """
+
+    sync_view = ProductView
+
+    async def get(
+        self,
+        request: HttpRequest,
+    ) -> HttpResponse:
+        """
+        Get info about product by its id.
+        :param request: request with "id" field.
+        :return: response whether request is successful with info about product.
+        """
+
+        profile: Profile = await async_get_profile_by_token(request)
+
+        if not profile.has_valid_token:
+            return render_response(INVALID_CREDENTIALS)
+
+        id_: str = request.GET.get("id")
+        try:
+            product: Product = await database_sync_to_async(Product.get_by_id)(id_)
+        except (ValueError, TypeError, Product.DoesNotExist):
+            return render_response(PRODUCT_NOT_FOUND)
+
+        return render(ProductSerializer(product).data, HTTP_200_OK)
+
+
+class AsyncListProductView(AsyncView):
+    """
+    Async variant of `ListProductView.get`: cached pages and products by ids are served without holding a thread
+    for auth call, pages missing in cache are built by `ListProductView` in thread pool.
+    """
+
+    sync_view = ListProductView
+
+    @staticmethod
+    def build_page(
+        request: HttpRequest,
+    ) -> HttpResponse:
+        response = ListProductView.as_view()(request)
+        response.render()
+        return response
+
+    @staticmethod
+    def cached_page(
+        request: HttpRequest,
+    ) -> tp.Tuple[tp.Optional[str], tp.Optional[tp.Any]]:
+        """
+        :return: `ETag` of requested page and page itself if it is cached, `None` if cache is not available.
+        """
+
+        version = catalogue_cache.version()
+        if version is None:
+            return None, None
+
+        key, etag = ListProductView.page_etag(request, version)
+        if ListProductView.not_modified(request, etag):
+            return etag, None
+
+        return etag, catalogue_cache.get_page(version, key)
+
+    async def get_many(
+        self,
+        request: HttpRequest,
+        ids: tp.List[str],
+    ) -> HttpResponse:
+        profile: Profile = await async_get_profile_by_token(request)
+
+        if not profile.has_valid_token:
+            return render_response(INVALID_CREDENTIALS)
+
+        if len(ids) > MULTI_GET_MAX_IDS:
+            return render_response(TOO_MANY_IDS)
+
+        products = await database_sync_to_async(Product.get_many)(ids)
+
+        return render(ListProductView.many_data(ids, products), HTTP_200_OK)
+
+    async def get(
+        self,
+        request: HttpRequest,
+    ) -> HttpResponse:
+        """
+        List page of products, or get products by ids if "ids" parameter is given (`?ids=a,b,c`).
+        """
+
+        if "ids" in request.GET:
+            ids = [id_ for id_ in request.GET["ids"].split(",") if id_]
+            return await self.get_many(request, ids)
+
+        etag, page = await database_sync_to_async(self.cached_page)(request)
+
+        if etag is not None and ListProductView.not_modified(request, etag):
+            response = render(None, HTTP_304_NOT_MODIFIED)
+        elif page is not None:
+            response = render(page, HTTP_200_OK)
+        else:
+            return await database_sync_to_async(self.build_page)(request)
+
+        response["ETag"] = etag
+        return response
@@ -0,0 +1,307 @@
+# coding=utf-8
+
+import os
+import json
+import hashlib
+import time
+import uuid
+
+import typing as tp
+
+import redis
+
+
+PRODUCT_CACHE_DB = int(os.environ.get("PRODUCT_CACHE_DB", 1))
+PRODUCT_CACHE_TTL = int(os.environ.get("PRODUCT_CACHE_TTL", 300))  # seconds
+PRODUCT_CACHE_NEGATIVE_TTL = int(os.environ.get("PRODUCT_CACHE_NEGATIVE_TTL", 30))  # seconds
+PRODUCT_CACHE_LOCK_TTL = 5000  # milliseconds
+PRODUCT_CACHE_WAIT = 1  # seconds to wait for fill by other process
+PRODUCT_LIST_CACHE_TTL = int(os.environ.get("PRODUCT_LIST_CACHE_TTL", 300))  # seconds
+
+# cached "not found" for unknown ids
+MISSING = ""
+
+
+def connect() -> redis.Redis:
+    return redis.Redis(
+        host=os.environ.get("REDIS_HOST"),
+        port=os.environ.get("REDIS_PORT"),
+        db=PRODUCT_CACHE_DB,
+        decode_responses=True,
+        socket_timeout=1,
+    )
+
+
+class ProductCache:
+    """
+    Read-through cache of single products in Redis.
+    Only one process fills a key at a time, others wait for it. Invalidation drops fill lock too,
+    so fill which read stale row before invalidation is not written.
+    Cache failures are not fatal, products are read from database then.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "product:",
+    ) -> None:
+        self.prefix = prefix
+        self.redis_ = None
+        return
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self.redis_ is None:
+            self.redis_ = connect()
+        return self.redis_
+
+    def _fill(
+        self,
+        key: str,
+        token: str,
+        load: tp.Callable[[], tp.Optional[tp.Dict[str, str]]],
+    ) -> tp.Optional[tp.Dict[str, str]]:
+        try:
+            fields = load()
+        except Exception:
+            self.redis.delete(key + ":lock")
+            raise
+
+        value, ttl = (json.dumps(fields), PRODUCT_CACHE_TTL) if fields is not None \
+            else (MISSING, PRODUCT_CACHE_NEGATIVE_TTL)
+
+        with self.redis.pipeline() as pipeline:
+            try:
+                pipeline.watch(key + ":lock")
+                # lock is dropped by invalidation while row was being read
+                if pipeline.get(key + ":lock") == token:
+                    pipeline.multi()
+                    pipeline.set(key, value, ex=ttl)
+                    pipeline.delete(key + ":lock")
+                    pipeline.execute()
+            except redis.WatchError:
+                pass
+
+        return fields
+
+    def get(
+        self,
+        id_: str,
+        load: tp.Callable[[], tp.Optional[tp.Dict[str, str]]],
+    ) -> tp.Optional[tp.Dict[str, str]]:
+        """
+        Get product fields from cache or load them from database.
+        :param id_: product id.
+        :param load: loads product fields, returns `None` if there is no such product.
+        :return: product fields or `None` for unknown id.
+        """
+
+        key = self.prefix + id_
+
+        try:
+            deadline = time.monotonic() + PRODUCT_CACHE_WAIT
+            while True:
+                value = self.redis.get(key)
+                if value is not None:
+                    return json.loads(value) if value != MISSING else None
+
+                token = uuid.uuid4().hex
+                if self.redis.set(key + ":lock", token, nx=True, px=PRODUCT_CACHE_LOCK_TTL):
+                    return self._fill(key, token, load)
+
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.01)
+        except redis.RedisError as e:
+            print(f"product cache is not available: {e!r}")
+
+        return load()
+
+    def get_many(
+        self,
+        ids: tp.List[str],
+        load: tp.Callable[[tp.List[str]], tp.Dict[str, tp.Dict[str, str]]],
+    ) -> tp.Dict[str, tp.Optional[tp.Dict[str, str]]]:
+        """
+        Get many products from cache in one round trip, misses are loaded together.
+        Unlike `get`, fills by other processes are not waited for, misses are loaded right away.
+        :param ids: distinct product ids.
+        :param load: loads fields of products with given ids, unknown ids are left out.
+        :return: id -> product fields or `None` for unknown id.
+        """
+
+        keys = [self.prefix + id_ for id_ in ids]
+
+        try:
+            values = self.redis.mget(keys) if keys else []
+        except redis.RedisError as e:
+            print(f"product cache is not available: {e!r}")
+            loaded = load(ids)
+            return {id_: loaded.get(id_) for id_ in ids}
+
+        products = {
+            id_: json.loads(value) if value != MISSING else None
+            for id_, value in zip(ids, values)
+            if value is not None
+        }
+        misses = [id_ for id_ in ids if id_ not in products]
+        if not misses:
+            return products
+
+        token = uuid.uuid4().hex
+        try:
+            with self.redis.pipeline() as pipeline:
+                for id_ in misses:
+                    pipeline.set(self.prefix + id_ + ":lock", token, nx=True, px=PRODUCT_CACHE_LOCK_TTL)
+                locked = [id_ for id_, is_locked in zip(misses, pipeline.execute()) if is_locked]
+        except redis.RedisError as e:
+            print(f"product cache is not available: {e!r}")
+            locked = []
+
+        try:
+            loaded = load(misses)
+        except Exception:
+            self._release_locks(locked)
+            raise
+
+        for id_ in misses:
+            products[id_] = loaded.get(id_)
+
+        if locked:
+            lock_keys = [self.prefix + id_ + ":lock" for id_ in locked]
+            try:
+                with self.redis.pipeline() as pipeline:
+                    pipeline.watch(*lock_keys)
+                    # locks dropped by invalidation while rows were being read are not ours anymore
+                    owned = [id_ for id_, lock in zip(locked, pipeline.mget(lock_keys)) if lock == token]
+                    pipeline.multi()
+                    for id_ in owned:
+                        fields = products[id_]
+                        if fields is not None:
+                            pipeline.set(self.prefix + id_, json.dumps(fields), ex=PRODUCT_CACHE_TTL)
+                        else:
+                            pipeline.set(self.prefix + id_, MISSING, ex=PRODUCT_CACHE_NEGATIVE_TTL)
+                        pipeline.delete(self.prefix + id_ + ":lock")
+                    pipeline.execute()
+            except redis.WatchError:
+                # some product was changed meanwhile, the rest is cached by the next read
+                self._release_locks(locked)
+            except redis.RedisError as e:
+                print(f"failed to fill product cache: {e!r}")
+
+        return products
+
+    def _release_locks(
+        self,
+        ids: tp.List[str],
+    ) -> None:
+        if not ids:
+            return
+
+        try:
+            self.redis.delete(*(self.prefix + id_ + ":lock" for id_ in ids))
+        except redis.RedisError as e:
+            print(f"failed to release product cache locks: {e!r}")
+
+    def invalidate(
+        self,
+        *ids: str,
+    ) -> None:
+        if not ids:
+            return
+
+        try:
+            self.redis.delete(*(
+                key
+                for id_ in ids
+                for key in (self.prefix + id_, self.prefix + id_ + ":lock")
+            ))
+        except redis.RedisError as e:
+            print(f"failed to invalidate product cache: {e!r}")
+
+    def clear(
+        self,
+    ) -> None:
+        try:
+            keys = list(self.redis.scan_iter(match=self.prefix + "*", count=1000))
+            if keys:
+                self.redis.delete(*keys)
+        except redis.RedisError as e:
+            print(f"failed to clear product cache: {e!r}")
+
+
+class CatalogueCache:
+    """
+    Cache of product list pages. Every write to catalogue bumps its version (after commit),
+    pages are cached per version, so they never have to be invalidated one by one.
+    Cache failures are not fatal, pages are read from database then.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "catalogue:",
+    ) -> None:
+        self.prefix = prefix
+        self.redis_ = None
+        return
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self.redis_ is None:
+            self.redis_ = connect()
+        return self.redis_
+
+    def version(
+        self,
+    ) -> tp.Optional[int]:
+        """
+        :return: current catalogue version, `None` if cache is not available.
+        """
+
+        try:
+            return int(self.redis.get(self.prefix + "version") or 0)
+        except redis.RedisError as e:
+            print(f"catalogue cache is not available: {e!r}")
+            return None
+
+    def bump(
+        self,
+    ) -> None:
+        try:
+            self.redis.incr(self.prefix + "version")
+        except redis.RedisError as e:
+            print(f"failed to bump catalogue version: {e!r}")
+
+    @staticmethod
+    def page_key(
+        *parts: str,
+    ) -> str:
+        return hashlib.blake2s("\n".join(parts).encode(), digest_size=16).hexdigest()
+
+    def get_page(
+        self,
+        version: int,
+        key: str,
+    ) -> tp.Optional[tp.Any]:
+        try:
+            page = self.redis.get(f"{self.prefix}{version}:{key}")
+        except redis.RedisError as e:
+            print(f"catalogue cache is not available: {e!r}")
+            return None
+
+        return json.loads(page) if page is not None else None
+
+    def set_page(
+        self,
+        version: int,
+        key: str,
+        page: tp.Any,
+    ) -> None:
+        try:
+            # pages of old versions are never read again and just expire
+            self.redis.set(f"{self.prefix}{version}:{key}", json.dumps(page), ex=PRODUCT_LIST_CACHE_TTL)
+        except redis.RedisError as e:
+            print(f"failed to cache catalogue page: {e!r}")
+
+
+product_cache = ProductCache()
+catalogue_cache = CatalogueCache()
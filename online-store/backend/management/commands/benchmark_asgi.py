@@ -0,0 +1,190 @@
+# coding=utf-8
+
+import io
+import sys
+import time
+import random
+import asyncio
+import statistics
+
+import typing as tp
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from auth_client.verification import verification_cache
+
+from backend.models import Product
+
+
+PATHS = [
+    "/api/product?id={id}",
+    "/api/products?page_size=20",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of product reads served by WSGI (sync views, fixed number of workers) "
+        "and by ASGI (async views, one event loop) with many concurrent clients. "
+        "Requests are made in process, without HTTP server, against real auth service, database and Redis. "
+        "Run with AUTH_STRICT_VERIFY=1 and --no-auth-cache to make every request wait for auth service."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=256, help="concurrent clients")
+        parser.add_argument("--workers", type=int, default=8, help="sync workers (threads) serving WSGI")
+        parser.add_argument("--token", default="", help="token of any profile")
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--path", action="append", help="path with query, {id} is replaced by random product id")
+        parser.add_argument("--no-auth-cache", action="store_true", help="verify token on every request")
+
+    def wsgi_request(
+        self,
+        application,
+        path: str,
+        options: tp.Dict[str, tp.Any],
+    ) -> int:
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD":     "GET",
+            "PATH_INFO":          path,
+            "QUERY_STRING":       query,
+            "SERVER_NAME":        options["host"],
+            "SERVER_PORT":        "80",
+            "SERVER_PROTOCOL":    "HTTP/1.1",
+            "HTTP_HOST":          options["host"],
+            "HTTP_AUTHORIZATION": f"Bearer {options['token']}",
+            "wsgi.input":         io.BytesIO(),
+            "wsgi.errors":        sys.stderr,
+            "wsgi.url_scheme":    "http",
+        }
+
+        status = []
+        response = application(environ, lambda status_, headers: status.append(status_))
+        try:
+            b"".join(response)
+        finally:
+            response.close()
+
+        return int(status[0].split()[0])
+
+    async def asgi_request(
+        self,
+        application,
+        path: str,
+        options: tp.Dict[str, tp.Any],
+    ) -> int:
+        path, _, query = path.partition("?")
+        scope = {
+            "type":         "http",
+            "asgi":         {"version": "3.0"},
+            "http_version": "1.1",
+            "method":       "GET",
+            "scheme":       "http",
+            "path":         path,
+            "raw_path":     path.encode(),
+            "query_string": query.encode(),
+            "root_path":    "",
+            "headers":      [
+                (b"host", options["host"].encode()),
+                (b"authorization", f"Bearer {options['token']}".encode()),
+            ],
+            "client":       ("127.0.0.1", 0),
+            "server":       (options["host"], 80),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        status = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await application(scope, receive, send)
+
+        return status[0]
+
+    async def run_clients(
+        self,
+        request: tp.Callable[[str], tp.Awaitable[int]],
+        paths: tp.List[str],
+        options: tp.Dict[str, tp.Any],
+    ) -> tp.Tuple[float, tp.List[float], Counter]:
+        """
+        Make requests by `concurrency` clients, every client sends next request when previous is answered.
+        :return: requests per second, latencies in ms and number of responses per status.
+        """
+
+        remaining = iter(range(options["requests"]))
+        latencies = []
+        statuses = Counter()
+
+        async def client():
+            for _ in remaining:
+                started = time.perf_counter()
+                statuses[await request(random.choice(paths))] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options["concurrency"])))
+        elapsed = time.perf_counter() - started
+
+        return options["requests"] / elapsed, sorted(latencies), statuses
+
+    def report(
+        self,
+        name: str,
+        result: tp.Tuple[float, tp.List[float], Counter],
+    ) -> None:
+        rps, latencies, statuses = result
+        self.stdout.write(
+            f"{name:<8}"
+            f"{f'{rps:.0f}':>10}"
+            f"{f'{statistics.median(latencies):.2f}':>12}"
+            f"{f'{latencies[int(len(latencies) * 0.99) - 1]:.2f}':>12}"
+            f"    {dict(statuses)}"
+        )
+
+    def handle(self, *args, **options):
+        from onlinestore.asgi import application as asgi_application
+        from onlinestore.wsgi import application as wsgi_application
+
+        if options["no_auth_cache"]:
+            verification_cache.max_size = 0
+
+        ids = list(Product.objects.values_list("id", flat=True)[:1000]) or ["unknown"]
+        paths = [
+            path.format(id=random.choice(ids))
+            for path in options["path"] or PATHS
+            for _ in range(100)
+        ]
+
+        workers = ThreadPoolExecutor(max_workers=options["workers"])
+        loop = asyncio.get_event_loop()
+
+        async def wsgi(path: str) -> int:
+            return await loop.run_in_executor(workers, self.wsgi_request, wsgi_application, path, options)
+
+        async def asgi(path: str) -> int:
+            return await self.asgi_request(asgi_application, path, options)
+
+        results = {}
+        for name, request in (("wsgi", wsgi), ("asgi", asgi)):
+            # warm up caches and connections
+            loop.run_until_complete(self.run_clients(request, paths, {**options, "requests": 100}))
+            results[name] = loop.run_until_complete(self.run_clients(request, paths, options))
+
+        workers.shutdown()
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} clients, {options['workers']} wsgi workers"
+        )
+        self.stdout.write(f"{'server':<8}{'req/s':>10}{'p50, ms':>12}{'p99, ms':>12}    statuses")
+        for name, result in results.items():
+            self.report(name, result)
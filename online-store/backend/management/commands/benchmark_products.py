@@ -0,0 +1,193 @@
+# coding=utf-8
+
+import time
+import random
+import hashlib
+import statistics
+
+import typing as tp
+
+from django.core.management.base import BaseCommand
+from django.db import (
+    connections,
+    transaction,
+)
+
+from backend.models import Product
+
+
+CATEGORIES = [
+    "Hobbies > Model Trains & Railway Sets > Rail Vehicles > Trains",
+    "Hobbies > Models > Cars",
+    "Characters & Brands > Disney > Toys",
+    "Games > Board Games",
+    "Arts & Crafts > Children's Craft Kits",
+    "Figures & Playsets > Science Fiction & Fantasy",
+    "Sports Toys & Outdoor > Balls",
+    "Die-Cast & Toy Vehicles > Toy Vehicles & Accessories",
+]
+WORDS = [
+    "hornby", "train", "set", "christmas", "express", "lego", "model", "car", "disney",
+    "puzzle", "board", "game", "kit", "figure", "ball", "track", "wagon", "deluxe",
+]
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure product list and lookup latency with and without product indexes. "
+        "Products are copied to temporary table of the same structure, which shadows product table "
+        "for this connection only, and generated rows are added there, so product table, its caches and "
+        "category facets are not changed and not locked. Database has to be named explicitly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", required=True, help="database alias to run benchmark against")
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def create_scratch_table(
+        self,
+        database: str,
+    ) -> None:
+        """
+        Create temporary copy of product table with its indexes and generated columns, but without triggers.
+        Temporary schema is searched first, so queries of this connection read and write the copy.
+        Table is dropped when transaction ends.
+        """
+
+        connection = connections[database]
+        table = Product._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relnamespace::regnamespace::text FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+            source = f"{cursor.fetchone()[0]}.{connection.ops.quote_name(table)}"
+
+            # temporary tables are cached in local buffers, default size would measure disk reads
+            cursor.execute("SET LOCAL temp_buffers = '1GB'")
+            cursor.execute(f"CREATE TEMPORARY TABLE {table} (LIKE {source} INCLUDING ALL) ON COMMIT DROP")
+            cursor.execute(f"INSERT INTO pg_temp.{table} (id, title, category) SELECT id, title, category FROM {source}")
+
+    def fill(
+        self,
+        database: str,
+        rows: int,
+        batch_size: int = 10_000,
+    ) -> None:
+        existing = Product.objects.using(database).count()
+        self.stdout.write(f"products in table: {existing}, generating {max(rows - existing, 0)} more")
+
+        for start in range(existing, rows, batch_size):
+            batch = []
+            for index in range(start, min(start + batch_size, rows)):
+                title = " ".join(random.choices(WORDS, k=4)) + f" {index}"
+                category = random.choice(CATEGORIES)
+                batch.append(Product(
+                    id=hashlib.blake2s(f"{title}{category}".encode()).hexdigest(),
+                    title=title,
+                    category=category,
+                ))
+            Product.objects.using(database).bulk_create(batch, ignore_conflicts=True)
+
+    def measure(
+        self,
+        query: tp.Callable[[], tp.Any],
+        repeat: int,
+    ) -> tp.Tuple[float, float]:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def run_queries(
+        self,
+        database: str,
+        repeat: int,
+        page_size: int,
+    ) -> tp.Dict[str, tp.Tuple[float, float]]:
+        products = Product.objects.using(database)
+
+        total = products.count()
+        middle: Product = products.order_by("title", "id")[total // 2]
+        sample: tp.List[Product] = list(products.order_by("?")[:repeat])
+        ordered = products.order_by("title", "id")
+
+        def match(product: Product) -> bool:
+            return products.filter(
+                id=product.id,
+                title=product.title,
+                category=product.category,
+            ).exists()
+
+        queries = {
+            "count":                lambda: products.count(),
+            "list first page":      lambda: list(ordered[:page_size]),
+            "list middle (offset)": lambda: list(ordered[total // 2:total // 2 + page_size]),
+            "list middle (keyset)": lambda: list(ordered.extra(
+                where=["(title, id) > (%s, %s)"],
+                params=[middle.title, middle.id],
+            )[:page_size]),
+            "lookup by id":         lambda: products.get(id=random.choice(sample).id),
+            "filter by category":   lambda: list(products.filter(
+                category=random.choice(CATEGORIES),
+            )[:page_size]),
+            "match id/title/cat":   lambda: match(random.choice(sample)),
+        }
+
+        return {
+            name: self.measure(query, repeat)
+            for name, query in queries.items()
+        }
+
+    def drop_indexes(
+        self,
+        database: str,
+    ) -> None:
+        connection = connections[database]
+        table = Product._meta.db_table
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+            for name, constraint in constraints.items():
+                if constraint["index"] and not constraint["primary_key"] and not constraint["unique"]:
+                    cursor.execute(f"DROP INDEX pg_temp.{connection.ops.quote_name(name)}")
+
+    def handle(self, *args, **options):
+        database = options["database"]
+
+        try:
+            # temporary table and everything done to it is dropped by rollback
+            with transaction.atomic(using=database):
+                self.create_scratch_table(database)
+                self.fill(database, options["rows"])
+
+                with connections[database].cursor() as cursor:
+                    cursor.execute(f"ANALYZE pg_temp.{Product._meta.db_table}")
+
+                after = self.run_queries(database, options["repeat"], options["page_size"])
+
+                self.drop_indexes(database)
+                before = self.run_queries(database, options["repeat"], options["page_size"])
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        self.stdout.write(f"{'query':<24}{'before p50/p95, ms':>24}{'after p50/p95, ms':>24}")
+        for name, (after_median, after_p95) in after.items():
+            before_median, before_p95 = before[name]
+            self.stdout.write(
+                f"{name:<24}"
+                f"{f'{before_median:.2f} / {before_p95:.2f}':>24}"
+                f"{f'{after_median:.2f} / {after_p95:.2f}':>24}"
+            )
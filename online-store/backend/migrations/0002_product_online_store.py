@@ -0,0 +1,51 @@
+# Generated by Django 3.0.7 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial_online_store'),
+    ]
+
+    # databases created before migrations were committed already have the table, created by migration
+    # generated on start of container, so it is created only if it does not exist
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                        CREATE TABLE IF NOT EXISTS "backend_product" (
+                            "id" text NOT NULL PRIMARY KEY,
+                            "title" text NOT NULL,
+                            "category" text NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS "backend_product_id_0eff0f29_like"
+                            ON "backend_product" ("id" text_pattern_ops);
+                    """,
+                    reverse_sql="""
+                        DROP TABLE "backend_product";
+                    """,
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='Product',
+                    fields=[
+                        ('id', models.TextField(primary_key=True, serialize=False)),
+                        ('title', models.TextField()),
+                        ('category', models.TextField()),
+                    ],
+                    options={
+                        'verbose_name': 'Product',
+                        'verbose_name_plural': 'Products',
+                    },
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['title', 'id'], name='product_title_id_idx'),
+        ),
+    ]
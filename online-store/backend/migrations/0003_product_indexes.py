@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_product_online_store'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.TextField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='id',
+            field=models.CharField(max_length=64, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.0.7 on 2026-10-18 18:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_product_indexes'),
+    ]
+
+    # generated column is filled by postgres on every write, including raw upserts of import service,
+    # so it is not a part of the model
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE backend_product ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', title), 'A') ||
+                    setweight(to_tsvector('simple', category), 'B')
+                ) STORED;
+                CREATE INDEX product_search_vector_idx ON backend_product USING GIN (search_vector);
+                CREATE INDEX product_title_trgm_idx ON backend_product USING GIN (title gin_trgm_ops);
+            """,
+            reverse_sql="""
+                DROP INDEX product_title_trgm_idx;
+                DROP INDEX product_search_vector_idx;
+                ALTER TABLE backend_product DROP COLUMN search_vector;
+            """,
+        ),
+    ]
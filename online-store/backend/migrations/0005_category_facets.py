@@ -0,0 +1,122 @@
+# Generated by Django 3.0.7 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+# `Hobbies > Models > Trains` -> `Hobbies`, `Hobbies > Models`, `Hobbies > Models > Trains`
+CATEGORY_PATHS = r"""
+    CREATE FUNCTION product_category_paths(category text)
+    RETURNS TABLE (path text, parent text, depth integer) AS $$
+        SELECT
+            array_to_string(parts[1:depth], ' > '),
+            array_to_string(parts[1:depth - 1], ' > '),
+            depth
+        FROM (
+            SELECT array_remove(regexp_split_to_array(trim(category), '\s*>\s*'), '') AS parts
+        ) AS split, generate_series(1, cardinality(parts)) AS depth
+    $$ LANGUAGE sql IMMUTABLE;
+"""
+
+# counts are changed once per statement with aggregated delta, facets are locked in the same order by every writer
+APPLY_DELTA = """
+    CREATE FUNCTION category_facets_apply(categories text[], signs integer[]) RETURNS void AS $$
+    BEGIN
+        INSERT INTO backend_categoryfacet (path, parent, depth, count)
+        SELECT paths.path, paths.parent, paths.depth, sum(changes.sign)
+        FROM unnest(categories, signs) AS changes (category, sign),
+             product_category_paths(changes.category) AS paths
+        GROUP BY paths.path, paths.parent, paths.depth
+        HAVING sum(changes.sign) <> 0
+        ORDER BY paths.path
+        ON CONFLICT (path) DO UPDATE SET count = backend_categoryfacet.count + EXCLUDED.count;
+
+        DELETE FROM backend_categoryfacet
+        WHERE count <= 0 AND path IN (
+            SELECT paths.path FROM unnest(categories) AS category, product_category_paths(category) AS paths
+        );
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION product_category_facets_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM category_facets_apply(
+                ARRAY(SELECT category FROM new_rows),
+                ARRAY(SELECT 1 FROM new_rows)
+            );
+        ELSIF TG_OP = 'UPDATE' THEN
+            PERFORM category_facets_apply(
+                ARRAY(SELECT category FROM old_rows) || ARRAY(SELECT category FROM new_rows),
+                ARRAY(SELECT -1 FROM old_rows) || ARRAY(SELECT 1 FROM new_rows)
+            );
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM category_facets_apply(
+                ARRAY(SELECT category FROM old_rows),
+                ARRAY(SELECT -1 FROM old_rows)
+            );
+        ELSE
+            DELETE FROM backend_categoryfacet;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = """
+    CREATE TRIGGER product_category_facets_insert AFTER INSERT ON backend_product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_category_facets_trigger();
+
+    CREATE TRIGGER product_category_facets_update AFTER UPDATE ON backend_product
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_category_facets_trigger();
+
+    CREATE TRIGGER product_category_facets_delete AFTER DELETE ON backend_product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_category_facets_trigger();
+
+    CREATE TRIGGER product_category_facets_truncate AFTER TRUNCATE ON backend_product
+    FOR EACH STATEMENT EXECUTE FUNCTION product_category_facets_trigger();
+"""
+
+BACKFILL = """
+    INSERT INTO backend_categoryfacet (path, parent, depth, count)
+    SELECT paths.path, paths.parent, paths.depth, count(*)
+    FROM backend_product, product_category_paths(backend_product.category) AS paths
+    GROUP BY paths.path, paths.parent, paths.depth;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('path', models.TextField(primary_key=True, serialize=False)),
+                ('parent', models.TextField(db_index=True)),
+                ('depth', models.IntegerField()),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Category facet',
+                'verbose_name_plural': 'Category facets',
+            },
+        ),
+        migrations.RunSQL(
+            sql=CATEGORY_PATHS + APPLY_DELTA + TRIGGERS + BACKFILL,
+            reverse_sql="""
+                DROP TRIGGER product_category_facets_truncate ON backend_product;
+                DROP TRIGGER product_category_facets_delete ON backend_product;
+                DROP TRIGGER product_category_facets_update ON backend_product;
+                DROP TRIGGER product_category_facets_insert ON backend_product;
+                DROP FUNCTION product_category_facets_trigger();
+                DROP FUNCTION category_facets_apply(text[], integer[]);
+                DROP FUNCTION product_category_paths(text);
+            """,
+        ),
+    ]
@@ -1,24 +1,97 @@
 # coding=utf-8
 
+import re
 import hashlib
 
-from django.db import models
+import typing as tp
+
+from django.db import (
+    connection,
+    models,
+    transaction,
+)
+from psycopg2.extras import execute_values
+
+from backend.cache import (
+    catalogue_cache,
+    product_cache,
+)
+
+
+ID_MAX_LENGTH = 64  # blake2s hex digest
 
 
 class Product(models.Model):
-    id = models.TextField(
+    id = models.CharField(
         primary_key=True,
+        max_length=ID_MAX_LENGTH,
     )
     title = models.TextField(
     )
     category = models.TextField(
+        db_index=True,
     )
 
     @staticmethod
     def get_by_id(
         id_: str,
+        cached: bool = True,
     ) -> 'Product':
-        return Product.objects.get(id=id_)
+        """
+        :param id_: product id.
+        :param cached: whether product may be read from cache, must be `False` for products being modified.
+        :return: product, raises `Product.DoesNotExist` for unknown id.
+        """
+
+        if not cached:
+            return Product.objects.get(id=id_)
+
+        if not isinstance(id_, str):
+            raise TypeError(f"product id must be string, not {type(id_).__name__}")
+
+        fields = product_cache.get(
+            id_=id_,
+            load=lambda: Product.objects.filter(id=id_).values("id", "title", "category").first(),
+        )
+        if fields is None:
+            raise Product.DoesNotExist
+
+        return Product.from_db("default", list(fields), list(fields.values()))
+
+    @staticmethod
+    def get_many(
+        ids: tp.List[str],
+    ) -> tp.List[tp.Optional['Product']]:
+        """
+        Get many products by ids, cached ones are not read from database, the rest is read with one query.
+        :param ids: product ids, may repeat.
+        :return: products in the same order, `None` for unknown ids.
+        """
+
+        def load(misses: tp.List[str]) -> tp.Dict[str, tp.Dict[str, str]]:
+            return {
+                fields["id"]: fields
+                for fields in Product.objects.filter(id__in=misses).values("id", "title", "category")
+            }
+
+        found = product_cache.get_many(
+            ids=list(dict.fromkeys(ids)),
+            load=load,
+        )
+
+        return [
+            Product.from_db("default", list(fields), list(fields.values())) if fields is not None else None
+            for fields in map(found.get, ids)
+        ]
+
+    @staticmethod
+    def make_id(
+        title: str,
+        category: str,
+    ) -> str:
+        return hashlib.blake2s(
+            (title + (category or "")).encode(),
+        ).hexdigest()
 
     @staticmethod
     def create(
@@ -26,9 +99,7 @@ class Product(models.Model):
         category: str,
         id_: str = "",
     ) -> str:
-        hash_ = id_ or hashlib.blake2s(
-            data=(title + category).encode(),
-        ).hexdigest()
+        hash_ = id_ or Product.make_id(title, category)
 
         product: Product = Product(
             id=hash_,
@@ -37,28 +108,276 @@ class Product(models.Model):
         )
 
         product.save()
+        # id might be cached as unknown
+        product_cache.invalidate(product.id)
+        catalogue_cache.bump()
 
         return product.id
 
+    @staticmethod
+    def search(
+        query: str,
+        after: tp.Optional[tp.Tuple[float, str]] = None,
+        limit: int = 20,
+    ) -> tp.List['Product']:
+        """
+        Find products whose title or category contain words starting with words of query,
+        or whose title is similar to query (trigrams, tolerates typos).
+        :param query: text typed by customer.
+        :param after: `(rank, id)` of the last product of previous page.
+        :param limit: maximum number of products.
+        :return: products with `rank` attribute, best matches first.
+        """
+
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+
+        table = connection.ops.quote_name(Product._meta.db_table)
+        params = {
+            "tsquery": " & ".join(f"{word}:*" for word in words),
+            "query":   " ".join(words),
+            "limit":   limit,
+        }
+
+        keyset = ""
+        if after is not None:
+            keyset = "WHERE (-rank, id) > (%(rank)s, %(id)s)"
+            params["rank"], params["id"] = -after[0], after[1]
+
+        return list(Product.objects.raw(
+            raw_query=f"""
+                SELECT id, title, category, rank FROM (
+                    SELECT id, title, category, (
+                        ts_rank(search_vector, to_tsquery('simple', %(tsquery)s)) +
+                        word_similarity(%(query)s, title)
+                    )::float8 AS rank
+                    FROM {table}
+                    WHERE search_vector @@ to_tsquery('simple', %(tsquery)s) OR %(query)s <%% title
+                ) AS matches
+                {keyset}
+                ORDER BY rank DESC, id
+                LIMIT %(limit)s
+            """,
+            params=params,
+        ))
+
+    @staticmethod
+    def insert_new(
+        products: tp.List['Product'],
+    ) -> tp.Set[str]:
+        """
+        Insert products whose ids do not exist yet, including ids inserted by concurrent transactions,
+        which would abort `bulk_create`.
+        :param products: products to insert.
+        :return: ids of inserted products.
+        """
+
+        if not products:
+            return set()
+
+        table = connection.ops.quote_name(Product._meta.db_table)
+
+        with connection.cursor() as cursor:
+            results = execute_values(
+                cur=cursor.cursor,
+                sql=f"""
+                    INSERT INTO {table} (id, title, category) VALUES %s
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING id
+                """,
+                argslist=[(product.id, product.title, product.category) for product in products],
+                page_size=1000,
+                fetch=True,
+            )
+
+        return {id_ for (id_,) in results}
+
+    @staticmethod
+    def bulk(
+        operations: tp.List[tp.Dict[str, str]],
+    ) -> tp.List[tp.Dict[str, str]]:
+        """
+        Create, edit and delete many products in one transaction with one query per kind of operation.
+        Invalid operations are skipped, the rest is applied.
+        :param operations: dicts with "op" ("create", "edit" or "delete") and product fields:
+            "title" and optional "category" and "id" to create, "id" and optional "title" and "category" to edit,
+            "id" to delete. Creates are applied first, then edits, then deletes.
+        :return: result of every operation in the same order, with "status" or "error".
+        """
+
+        results: tp.List[tp.Dict[str, str]] = [{} for _ in operations]
+
+        def fail(index: int, error: str) -> None:
+            results[index] = {"op": operations[index].get("op"), "id": operations[index].get("id"), "error": error}
+
+        creates: tp.Dict[str, tp.Tuple[int, Product]] = {}
+        edits: tp.Dict[str, tp.List[int]] = {}
+        deletes: tp.Dict[str, tp.List[int]] = {}
+
+        for index, operation in enumerate(operations):
+            op = operation.get("op")
+            id_ = operation.get("id")
+            title = operation.get("title")
+            category = operation.get("category")
+
+            if id_ is not None and not isinstance(id_, str) \
+                    or title is not None and not isinstance(title, str) \
+                    or category is not None and not isinstance(category, str):
+                fail(index, "Fields must be strings.")
+            elif id_ is not None and len(id_) > ID_MAX_LENGTH:
+                fail(index, f"Id must be at most {ID_MAX_LENGTH} characters.")
+            elif op == "create":
+                if not title:
+                    fail(index, "Title must not be empty.")
+                    continue
+                id_ = id_ or Product.make_id(title, category)
+                if id_ in creates:
+                    fail(index, "Duplicate product.")
+                    continue
+                creates[id_] = index, Product(id=id_, title=title, category=category or "")
+            elif op in ("edit", "delete"):
+                if not id_:
+                    fail(index, "No product with such id.")
+                    continue
+                (edits if op == "edit" else deletes).setdefault(id_, []).append(index)
+            else:
+                fail(index, "Unknown operation.")
+
+        with transaction.atomic():
+            created = Product.insert_new([product for _, product in creates.values()])
+            for id_, (index, _) in creates.items():
+                if id_ in created:
+                    results[index] = {"op": "create", "id": id_, "status": "created"}
+                else:
+                    fail(index, "Product already exists.")
+
+            products = Product.objects.select_for_update().in_bulk(list(edits))
+            for id_, indexes in edits.items():
+                product = products.get(id_)
+                for index in indexes:
+                    if product is None:
+                        fail(index, "No product with such id.")
+                        continue
+                    if operations[index].get("title"):
+                        product.title = operations[index]["title"]
+                    if operations[index].get("category") is not None:
+                        product.category = operations[index]["category"]
+                    results[index] = {"op": "edit", "id": id_, "status": "edited"}
+
+            Product.objects.bulk_update(
+                list(products.values()),
+                fields=["title", "category"],
+                batch_size=1000,
+            )
+
+            deleted = set(
+                Product.objects
+                .filter(id__in=list(deletes))
+                .values_list("id", flat=True)
+            )
+            Product.objects.filter(id__in=deleted).delete()
+            for id_, indexes in deletes.items():
+                for index in indexes:
+                    if id_ in deleted:
+                        results[index] = {"op": "delete", "id": id_, "status": "deleted"}
+                    else:
+                        fail(index, "No product with such id.")
+
+            changed = list(created) + list(products) + list(deleted)
+
+            def invalidate() -> None:
+                product_cache.invalidate(*changed)
+                catalogue_cache.bump()
+
+            if changed:
+                transaction.on_commit(invalidate)
+
+        return results
+
     @staticmethod
     def delete_by_id(
         id_: str,
     ) -> None:
         if id_ == "all":
             Product.objects.all().delete()
+            product_cache.clear()
+            catalogue_cache.bump()
             return
 
-        product: Product = Product.get_by_id(id_)
+        product: Product = Product.get_by_id(id_, cached=False)
         product.delete()
+        product_cache.invalidate(id_)
+        catalogue_cache.bump()
         return
 
 
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            models.Index(
+                fields=["title", "id"],
+                name="product_title_id_idx",
+            ),
+        ]
 
 
     def __str__(
         self
     ) -> str:
         return self.title
+
+
+class CategoryFacet(models.Model):
+    """
+    Number of products in every category and in every its ancestor (`Hobbies`, `Hobbies > Models`, ...).
+    Maintained by database triggers on product table, so it is updated by every writer, including import.
+    """
+
+    path = models.TextField(
+        primary_key=True,
+    )
+    parent = models.TextField(
+        db_index=True,  # "" for top level categories
+    )
+    depth = models.IntegerField(
+    )
+    count = models.IntegerField(
+    )
+
+    @staticmethod
+    def normalize(
+        path: str,
+    ) -> str:
+        return " > ".join(
+            part.strip()
+            for part in path.split(">")
+            if part.strip()
+        )
+
+    @staticmethod
+    def children(
+        prefix: str = "",
+    ) -> tp.List['CategoryFacet']:
+        """
+        :param prefix: category to drill down into, top level categories for empty one.
+        :return: subcategories of category, largest first.
+        """
+
+        return list(
+            CategoryFacet.objects
+            .filter(parent=CategoryFacet.normalize(prefix))
+            .order_by("-count", "path")
+        )
+
+
+    class Meta:
+        verbose_name = "Category facet"
+        verbose_name_plural = "Category facets"
+
+
+    def __str__(
+        self
+    ) -> str:
+        return f"{self.path} ({self.count})"
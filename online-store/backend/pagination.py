@@ -0,0 +1,159 @@
+# coding=utf-8
+
+import json
+import base64
+import binascii
+
+import typing as tp
+
+from django.db.models import QuerySet
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import (
+    remove_query_param,
+    replace_query_param,
+)
+
+from backend.models import Product
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Page number pagination by default, keyset pagination over `(title, id)` when `cursor` parameter is present.
+    Keyset mode never counts rows and costs the same for every page, start it with empty `cursor`.
+    """
+
+    page_size_query_param = "page_size"
+    page_size = 4
+    cursor_query_param = "cursor"
+
+    def __init__(
+        self,
+    ) -> None:
+        self.cursor_mode = False
+        self.next_cursor = None
+        self.previous_cursor = None
+        return
+
+    @staticmethod
+    def encode_cursor(
+        title: str,
+        id_: str,
+        reverse: bool,
+    ) -> str:
+        data = json.dumps([title, id_, reverse], separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(
+        cursor: str,
+    ) -> tp.Tuple[str, str, bool]:
+        try:
+            title, id_, reverse = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(title), str(id_), bool(reverse)
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound("Invalid cursor.")
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        view=None,
+    ) -> tp.Optional[tp.List]:
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_mode = True
+        self.request = request
+
+        page_size = self.get_page_size(request)
+        cursor = request.query_params[self.cursor_query_param]
+
+        reverse = False
+        if cursor:
+            title, id_, reverse = self.decode_cursor(cursor)
+            # row comparison lets postgres walk (title, id) index directly
+            queryset = queryset.extra(
+                where=[f"(title, id) {'<' if reverse else '>'} (%s, %s)"],
+                params=[title, id_],
+            )
+
+        ordering = ("-title", "-id") if reverse else ("title", "id")
+        items = list(queryset.order_by(*ordering)[:page_size + 1])
+
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        if reverse:
+            items.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if items:
+            first, last = items[0], items[-1]
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(last.title, last.id, False)
+            if cursor and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(first.title, first.id, True)
+
+        return items
+
+    def get_cursor_link(
+        self,
+        cursor: tp.Optional[str],
+    ) -> tp.Optional[str]:
+        if cursor is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(
+        self,
+        data,
+    ) -> Response:
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        return Response({
+            "next":     self.get_cursor_link(self.next_cursor),
+            "previous": self.get_cursor_link(self.previous_cursor),
+            "results":  data,
+        })
+
+
+class SearchPagination(ProductPagination):
+    """
+    Keyset pagination of search results over `(rank, id)`, forward only.
+    """
+
+    def paginate_search(
+        self,
+        query: str,
+        request: Request,
+    ) -> tp.List[Product]:
+        self.cursor_mode = True
+        self.request = request
+
+        page_size = self.get_page_size(request)
+
+        after = None
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                rank, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+                after = float(rank), str(id_)
+            except (binascii.Error, TypeError, ValueError):
+                raise NotFound("Invalid cursor.")
+
+        items = Product.search(query, after, page_size + 1)
+
+        self.next_cursor = self.previous_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            data = json.dumps([items[-1].rank, items[-1].id], separators=(",", ":"))
+            self.next_cursor = base64.urlsafe_b64encode(data.encode()).decode()
+
+        return items
@@ -0,0 +1,32 @@
+# coding=utf-8
+
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON into list of objects, one per line.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(
+        self,
+        stream,
+        media_type=None,
+        parser_context=None,
+    ):
+        items = []
+
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                raise ParseError(f"NDJSON parse error on line {number}: {e}")
+
+        return items
@@ -2,10 +2,36 @@
 
 from rest_framework import serializers
 
-from backend.models import Product
+from backend.models import (
+    CategoryFacet,
+    Product,
+)
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ["title", "category", "id"]
+
+
+class ProductSearchSerializer(ProductSerializer):
+    rank = serializers.FloatField(
+        read_only=True,
+    )
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ["rank"]
+
+
+class CategoryFacetSerializer(serializers.ModelSerializer):
+    name = serializers.SerializerMethodField()
+
+    def get_name(
+        self,
+        facet: CategoryFacet,
+    ) -> str:
+        return facet.path.rsplit(" > ", 1)[-1]
+
+    class Meta:
+        model = CategoryFacet
+        fields = ["path", "name", "count"]
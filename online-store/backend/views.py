@@ -1,31 +1,55 @@
 # coding=utf-8
 
-import grpc
 import os
 
+import typing as tp
+
 from rest_framework.decorators import api_view
 from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.status import (
     HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
     HTTP_404_NOT_FOUND,
 )
 
-from api.proto.auth_pb2_grpc import AuthStub
+from auth_client.verification import (
+    get_profile_by_token,
+    verification_cache,
+)
+
 from api.proto.auth_pb2 import (
     Admin,
     Profile,
-    Token,
 )
 
-from backend.models import Product
-from backend.serializers import ProductSerializer
+from backend.cache import (
+    catalogue_cache,
+    product_cache,
+)
+from backend.models import (
+    CategoryFacet,
+    Product,
+)
+from backend.parsers import NDJSONParser
+from backend.pagination import (
+    ProductPagination,
+    SearchPagination,
+)
+from backend.serializers import (
+    CategoryFacetSerializer,
+    ProductSearchSerializer,
+    ProductSerializer,
+)
+
 
+BULK_MAX_OPERATIONS = int(os.environ.get("BULK_MAX_OPERATIONS", 10000))
+MULTI_GET_MAX_IDS = int(os.environ.get("MULTI_GET_MAX_IDS", 1000))
 
 INVALID_CREDENTIALS = Response(
     data={
@@ -39,27 +63,12 @@ PRODUCT_NOT_FOUND = Response(
     },
     status=HTTP_404_NOT_FOUND,
 )
-
-
-def get_profile_by_token(
-    request: Request,
-) -> Profile:
-    """
-    Get profile associated with token from request.
-    :param request: request with token in header.
-    :return: profile (from gRPC specification).
-    """
-
-    token_from_request = request.META.get("HTTP_AUTHORIZATION", "").split("Bearer ")[-1]
-
-    auth_grpc = os.environ.get("AUTH_GRPC_HOST") + ":" + os.environ.get("AUTH_GRPC_PORT")
-
-    with grpc.insecure_channel(auth_grpc) as channel:
-        stub = AuthStub(channel)
-        token = Token(token=token_from_request)
-        profile = stub.Verify(token)
-
-    return profile
+TOO_MANY_IDS = Response(
+    data={
+        "message": f"At most {MULTI_GET_MAX_IDS} ids per request.",
+    },
+    status=HTTP_400_BAD_REQUEST,
+)
 
 
 class ProductView(APIView):
@@ -115,7 +124,7 @@ class ProductView(APIView):
 
         id_: str = request.data.get("id")
         try:
-            product: Product = Product.get_by_id(id_)
+            product: Product = Product.get_by_id(id_, cached=False)
         except (ValueError, TypeError, Product.DoesNotExist):
             return PRODUCT_NOT_FOUND
 
@@ -128,6 +137,8 @@ class ProductView(APIView):
             product.category = category
 
         product.save()
+        product_cache.invalidate(product.id)
+        catalogue_cache.bump()
 
         return Response(
             data={
@@ -203,20 +214,287 @@ class ProductView(APIView):
         )
 
 
+class BulkProductView(APIView):
+    """
+    Many changes of products in one request.
+    """
+
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(
+        self,
+        request: Request,
+    ) -> Response:
+        """
+        Create, edit and delete products in one transaction.
+        :param request: request with list of operations (JSON array or NDJSON), e.g.
+            `{"op": "create", "title": ..., "category": ...}`, `{"op": "edit", "id": ..., "title": ...}`,
+            `{"op": "delete", "id": ...}`, or with JSON object of "create", "edit" and "delete" lists.
+        :return: response with result of every operation in request order.
+        """
+
+        profile: Profile = get_profile_by_token(request)
+
+        if not profile.has_valid_token or profile.role != Admin:
+            return INVALID_CREDENTIALS
+
+        operations = request.data
+        if isinstance(operations, dict):
+            if not all(isinstance(operations.get(op, []), list) for op in ("create", "edit", "delete")):
+                return Response(
+                    data={
+                        "message": "Operations of every kind must be a list.",
+                    },
+                    status=HTTP_400_BAD_REQUEST,
+                )
+
+            operations = [
+                {**(item if isinstance(item, dict) else {"id": item}), "op": op}
+                for op in ("create", "edit", "delete")
+                for item in operations.get(op, [])
+            ]
+
+        if not isinstance(operations, list) or not all(isinstance(item, dict) for item in operations):
+            return Response(
+                data={
+                    "message": "Operations must be a list of objects.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        if len(operations) > BULK_MAX_OPERATIONS:
+            return Response(
+                data={
+                    "message": f"At most {BULK_MAX_OPERATIONS} operations per request.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        results = Product.bulk(operations)
+
+        return Response(
+            data={
+                "failed":  sum(1 for result in results if "error" in result),
+                "results": results,
+            },
+            status=HTTP_200_OK,
+        )
+
+
 class ListProductView(ListAPIView):
     """
     List view for multiple products.
     """
 
+    queryset = Product.objects.all().order_by("title", "id")
+    serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+
+    def get(
+        self,
+        request: Request,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        List page of products, or get products by ids if "ids" parameter is given (`?ids=a,b,c`).
+        """
+
+        if "ids" in request.query_params:
+            ids = [id_ for id_ in request.query_params["ids"].split(",") if id_]
+            return self.get_many(request, ids)
 
-    class Pagination(PageNumberPagination):
-        page_size_query_param = "page_size"
-        page_size = 4
+        return self.list(request, *args, **kwargs)
 
+    def post(
+        self,
+        request: Request,
+    ) -> Response:
+        """
+        Get products by ids, for lists of ids too long for query string.
+        :param request: request with "ids" list.
+        """
 
-    queryset = Product.objects.all().order_by("title")
-    serializer_class = ProductSerializer
-    pagination_class = Pagination
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(id_, str) for id_ in ids):
+            return Response(
+                data={
+                    "message": "Ids must be a list of strings.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        return self.get_many(request, ids)
+
+    @staticmethod
+    def get_many(
+        request: Request,
+        ids: tp.List[str],
+    ) -> Response:
+        """
+        Get many products at once: cached ones are read from cache, the rest with one database query.
+        :param request: request with token.
+        :param ids: product ids.
+        :return: response with products in request order, unknown ids are marked with "error".
+        """
+
+        profile: Profile = get_profile_by_token(request)
+
+        if not profile.has_valid_token:
+            return INVALID_CREDENTIALS
+
+        if len(ids) > MULTI_GET_MAX_IDS:
+            return TOO_MANY_IDS
+
+        products = Product.get_many(ids)
+
+        return Response(
+            data=ListProductView.many_data(ids, products),
+            status=HTTP_200_OK,
+        )
+
+    @staticmethod
+    def many_data(
+        ids: tp.List[str],
+        products: tp.List[tp.Optional[Product]],
+    ) -> tp.Dict[str, tp.Any]:
+        return {
+            "missing":  sum(1 for product in products if product is None),
+            "products": [
+                ProductSerializer(product).data if product is not None
+                else {"id": id_, "error": "No product with such id."}
+                for id_, product in zip(ids, products)
+            ],
+        }
+
+    @staticmethod
+    def page_etag(
+        request: Request,
+        version: int,
+    ) -> tp.Tuple[str, str]:
+        """
+        :return: cache key of requested page and its `ETag` for given catalogue version.
+        """
+
+        # links to other pages are absolute, so host is a part of key too
+        key = catalogue_cache.page_key(
+            request.get_host(),
+            *(
+                f"{param}={request.GET[param]}"
+                for param in ("page", "page_size", "cursor")
+                if param in request.GET
+            ),
+        )
+
+        return key, f'"{version}-{key}"'
+
+    @staticmethod
+    def not_modified(
+        request: Request,
+        etag: str,
+    ) -> bool:
+        if_none_match = request.headers.get("If-None-Match", "")
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+    def list(
+        self,
+        request: Request,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        List page of products, pages are cached per catalogue version.
+        Unchanged page is not sent again if its `ETag` is given in `If-None-Match`.
+        """
+
+        version = catalogue_cache.version()
+        if version is None:
+            return super().list(request, *args, **kwargs)
+
+        key, etag = self.page_etag(request, version)
+
+        if self.not_modified(request, etag):
+            return Response(
+                status=HTTP_304_NOT_MODIFIED,
+                headers={
+                    "ETag": etag,
+                },
+            )
+
+        page = catalogue_cache.get_page(version, key)
+        if page is not None:
+            response = Response(
+                data=page,
+                status=HTTP_200_OK,
+            )
+        else:
+            response = super().list(request, *args, **kwargs)
+            catalogue_cache.set_page(version, key, response.data)
+
+        response["ETag"] = etag
+
+        return response
+
+
+class SearchProductView(APIView):
+    """
+    Search over titles and categories of products.
+    """
+
+    def get(
+        self,
+        request: Request,
+    ) -> Response:
+        """
+        Search products by words or their beginnings, typos in title are tolerated.
+        :param request: request with "q" and optional "page_size" and "cursor" parameters.
+        :return: response with best matching products first and link to the next page.
+        """
+
+        query: str = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                data={
+                    "message": "Query must not be empty.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        paginator = SearchPagination()
+        products = paginator.paginate_search(query, request)
+
+        serializer = ProductSearchSerializer(
+            products,
+            many=True,
+        )
+
+        return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(["GET"])
+def category_facets(
+    request: Request,
+) -> Response:
+    """
+    Get number of products in subcategories of category, counts are maintained on every write.
+    :param request: request with optional "prefix" parameter (`Hobbies > Models`), top level categories without it.
+    :return: response with subcategories, largest first.
+    """
+
+    prefix: str = CategoryFacet.normalize(request.query_params.get("prefix", ""))
+
+    serializer = CategoryFacetSerializer(
+        CategoryFacet.children(prefix),
+        many=True,
+    )
+
+    return Response(
+        data={
+            "prefix":     prefix,
+            "categories": serializer.data,
+        },
+        status=HTTP_200_OK,
+    )
 
 
 @api_view(["PUT"])
@@ -246,9 +524,32 @@ def populate(
         )
         product.save()
 
+    catalogue_cache.bump()
+
     return Response(
         data={
             "message": "Database populated successfully.",
         },
         status=HTTP_200_OK,
     )
+
+
+@api_view(["GET"])
+def auth_cache_stats(
+    request: Request,
+) -> Response:
+    """
+    Show size and hit/miss counters of token verification cache (current process only).
+    :param request: request with admin token in header.
+    :return: response with cache statistics.
+    """
+
+    profile: Profile = get_profile_by_token(request)
+
+    if not profile.has_valid_token or profile.role != Admin:
+        return INVALID_CREDENTIALS
+
+    return Response(
+        data=verification_cache.stats(),
+        status=HTTP_200_OK,
+    )
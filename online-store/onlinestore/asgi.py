@@ -7,12 +7,205 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+
+Product reads (`GET /api/product`, `GET /api/products`) are served by async views, which call auth service
+through `grpc.aio` and query database in thread pool, so a worker is not blocked while they are waited for.
+Everything else is handled by Django as usual. Compare with WSGI by `python manage.py benchmark_asgi`.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import typing as tp
+
+import django
+
+from asgiref.sync import sync_to_async
+from django.core import signals
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import response_for_exception
+from django.core.exceptions import RequestAborted
+from django.http import FileResponse
+from django.urls import (
+    Resolver404,
+    get_resolver,
+    set_script_prefix,
+)
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.log import log_response
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'onlinestore.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# models can be imported only after setup
+from backend.async_views import (
+    AsyncListProductView,
+    AsyncProductView,
+)
+
+
+class AsyncReadHandler(ASGIHandler):
+    """
+    GET and HEAD requests resolved by URLconf to a view which has async variant (`AsyncView.sync_view`)
+    are served by that variant, the rest by Django as usual.
+    Django 3.0 has neither async views nor async middleware, so the middleware chain built by `load_middleware`
+    is applied to async views the way `MiddlewareMixin` applies it to sync views: `process_request`,
+    `process_view`, `process_exception`, `process_template_response` and `process_response` hooks
+    of the same middleware instances, in the same order, with exceptions converted to responses at every layer.
+    Middleware which is not made of hooks can not be applied so, then every request is served by Django.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.middleware_ = self.chain_middleware()
+
+        self.async_views_ = {}
+        if self.middleware_ is not None:
+            self.async_views_ = {
+                view.sync_view: view
+                for view in (AsyncProductView(), AsyncListProductView())
+            }
+
+    def chain_middleware(
+        self,
+    ) -> tp.Optional[tp.List[MiddlewareMixin]]:
+        """
+        :return: middleware instances of chain built by `load_middleware`, outermost first,
+        `None` if some of them are not made of hooks.
+        """
+
+        middleware = []
+
+        # every layer is wrapped by `convert_exception_to_response`, which keeps wrapped layer in `__wrapped__`
+        layer = getattr(self._middleware_chain, "__wrapped__", None)
+        while isinstance(layer, MiddlewareMixin) and type(layer).__call__ is MiddlewareMixin.__call__:
+            middleware.append(layer)
+            layer = getattr(layer.get_response, "__wrapped__", None)
+
+        if layer != self._get_response:
+            print(f"middleware {layer!r} is not made of hooks, async views are disabled")
+            return None
+
+        return middleware
+
+    def resolve_async_view(
+        self,
+        request,
+    ):
+        """
+        :return: async view of request and its resolver match, `None` and `None` if request is served by sync view.
+        """
+
+        if request.method not in ("GET", "HEAD") or not self.async_views_:
+            return None, None
+
+        try:
+            resolver_match = get_resolver(getattr(request, "urlconf", None)).resolve(request.path_info)
+        except Resolver404:
+            return None, None
+
+        view = self.async_views_.get(getattr(resolver_match.func, "view_class", None))
+        if view is None:
+            return None, None
+
+        return view, resolver_match
+
+    async def get_view_response(
+        self,
+        view,
+        resolver_match,
+        request,
+    ):
+        """
+        Async counterpart of `BaseHandler._get_response`.
+        """
+
+        callback, callback_args, callback_kwargs = resolver_match
+        request.resolver_match = resolver_match
+
+        response = None
+        for middleware_method in self._view_middleware:
+            response = middleware_method(request, callback, callback_args, callback_kwargs)
+            if response:
+                break
+
+        if response is None:
+            try:
+                response = view.finalize(await view.get(request))
+            except Exception as e:
+                response = self.process_exception_by_middleware(e, request)
+
+        if hasattr(response, "render") and callable(response.render):
+            for middleware_method in self._template_response_middleware:
+                response = middleware_method(request, response)
+            response = response.render()
+
+        return response
+
+    async def get_async_response(
+        self,
+        view,
+        resolver_match,
+        request,
+        index: int = 0,
+    ):
+        """
+        Pass request through middleware starting from `index`, like `MiddlewareMixin.__call__`
+        wrapped by `convert_exception_to_response` does.
+        """
+
+        try:
+            if index == len(self.middleware_):
+                return await self.get_view_response(view, resolver_match, request)
+
+            middleware = self.middleware_[index]
+
+            response = None
+            if hasattr(middleware, "process_request"):
+                response = middleware.process_request(request)
+            response = response or await self.get_async_response(view, resolver_match, request, index + 1)
+            if hasattr(middleware, "process_response"):
+                response = middleware.process_response(request, response)
+
+            return response
+        except Exception as e:
+            return response_for_exception(request, e)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.async_views_:
+            return await super().__call__(scope, receive, send)
+
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+
+        set_script_prefix(self.get_script_prefix(scope))
+        await sync_to_async(signals.request_started.send)(sender=self.__class__, scope=scope)
+
+        request, response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(response, send)
+            return
+
+        view, resolver_match = self.resolve_async_view(request)
+        if view is None:
+            response = await sync_to_async(self.get_response)(request)
+        else:
+            response = await self.get_async_response(view, resolver_match, request)
+            response._resource_closers.append(request.close)
+            if response.status_code >= 400:
+                log_response(
+                    "%s: %s", response.reason_phrase, request.path,
+                    response=response,
+                    request=request,
+                )
+
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+
+        await self.send_response(response, send)
+
+
+application = AsyncReadHandler()
@@ -21,8 +21,12 @@ from django.contrib import admin
 from django.urls import path
 
 from backend.views import (
+    BulkProductView,
     ProductView,
     ListProductView,
+    SearchProductView,
+    auth_cache_stats,
+    category_facets,
     populate,
 )
 
@@ -32,5 +36,9 @@ urlpatterns = [
 
     path("api/product", ProductView.as_view()),
     path("api/products", ListProductView.as_view()),
+    path("api/products/search", SearchProductView.as_view()),
+    path("api/products/bulk", BulkProductView.as_view()),
+    path("api/products/categories", category_facets),
     path("api/populate", populate),
+    path("api/auth_cache_stats", auth_cache_stats),
 ]
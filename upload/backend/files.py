@@ -2,44 +2,182 @@
 
 import os
 import hashlib
+import tempfile
 
 import typing as tp
 
+import redis
+
+from django.conf import settings
 from django.core.files import File
 
 
-def compute_blake2b_hash(
-    file
-) -> str:
+UPLOAD_DIR = "/tmp/files"
+# import whose worker has not reported progress for that long is considered dead and may be claimed again
+CLAIM_TTL = int(os.environ.get("UPLOAD_CLAIM_TTL", 10 * 60))  # seconds
+
+
+def save_to_tempdir(file: File) -> tp.Tuple[str, str]:
     """
-    Compute blake2b hash for given file (must be open).
-    :param file: file-like object with `.read` method.
-    :return: computed hash.
+    Save open file to disk under its blake2b hash in single pass:
+    file is hashed while it is streamed to temporary file, which is then atomically linked to the hash.
+    :param file: open Django file.
+    :return: path to saved file and its hash.
     """
 
     file_hash = hashlib.blake2b()
 
-    while chunk := file.read(8192):
-        file_hash.update(chunk)
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload_")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            for chunk in file.chunks():
+                file_hash.update(chunk)
+                temp_file.write(chunk)
+
+        path = os.path.join(UPLOAD_DIR, file_hash.hexdigest())
+        try:
+            # unlike rename, link never replaces file which is being imported already
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.remove(temp_path)
 
-    return file_hash.hexdigest()
+    return path, file_hash.hexdigest()
 
 
-def save_to_tempdir(file: File) -> tp.Tuple[str, bool]:
+class UploadIndex:
     """
-    Save open file to disk using blake2b hash.
-    :param file: open Django file.
-    :return: whether file already exists.
+    Index of uploaded files shared by web and worker processes through Redis:
+    hash -> import status and number of parsed rows.
+    File being parsed is claimed by key which expires unless workers keep refreshing it.
     """
 
-    file_hash = compute_blake2b_hash(file)
-    path = os.path.join("/tmp/files", file_hash)
+    PARSING = "parsing"
+    PARSED = "parsed"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        prefix: str = "upload:",
+    ) -> None:
+        self.prefix = prefix
+        self.redis_ = None
+        return
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self.redis_ is None:
+            # the same Redis serves as `django-q` broker
+            self.redis_ = redis.Redis(
+                **settings.Q_CLUSTER["redis"],
+                decode_responses=True,
+            )
+        return self.redis_
+
+    def get(
+        self,
+        file_hash: str,
+    ) -> tp.Dict[str, tp.Union[str, int]]:
+        return {
+            field: value if field == "status" else int(value)
+            for field, value in self.redis.hgetall(self.prefix + file_hash).items()
+        }
+
+    def claim_key(
+        self,
+        file_hash: str,
+    ) -> str:
+        return self.prefix + file_hash + ":claim"
+
+    def claim(
+        self,
+        file_hash: str,
+    ) -> bool:
+        """
+        Atomically mark file as being imported.
+        :param file_hash: hash of uploaded file.
+        :return: whether file should be imported, false if it is imported already or is being imported.
+        """
+
+        key = self.prefix + file_hash
+
+        with self.redis.pipeline() as pipeline:
+            try:
+                pipeline.watch(key, self.claim_key(file_hash))
+                status = pipeline.hget(key, "status")
+                # failed import and import whose worker died are retried by the next upload of the same file
+                if status == self.PARSED or status == self.PARSING and pipeline.exists(self.claim_key(file_hash)):
+                    return False
+                pipeline.multi()
+                pipeline.delete(key)
+                pipeline.hset(key, "status", self.PARSING)
+                pipeline.set(self.claim_key(file_hash), 1, ex=CLAIM_TTL)
+                pipeline.execute()
+            except redis.WatchError:
+                return False
+
+        return True
+
+    def heartbeat(
+        self,
+        file_hash: str,
+    ) -> None:
+        """
+        Keep claim of file being parsed alive.
+        """
+
+        self.redis.set(self.claim_key(file_hash), 1, ex=CLAIM_TTL)
+
+    def start(
+        self,
+        file_hash: str,
+        parts: int,
+    ) -> None:
+        """
+        :param file_hash: hash of uploaded file.
+        :param parts: number of independently parsed parts of file.
+        """
+
+        self.redis.hset(self.prefix + file_hash, mapping={"parts": parts, "rows": 0})
+        # parts may wait in queue of cluster
+        self.heartbeat(file_hash)
+
+    def attach_job(
+        self,
+        file_hash: str,
+        job_id: int,
+    ) -> None:
+        self.redis.hset(self.prefix + file_hash, "job", job_id)
+
+    def part_parsed(
+        self,
+        file_hash: str,
+        rows: int,
+    ) -> bool:
+        """
+        :return: whether the whole file is parsed.
+        """
+
+        key = self.prefix + file_hash
+
+        with self.redis.pipeline() as pipeline:
+            pipeline.hincrby(key, "rows", rows)
+            pipeline.hincrby(key, "parts", -1)
+            _, parts_left = pipeline.execute()
+
+        if parts_left == 0:
+            self.redis.hset(key, "status", self.PARSED)
+            self.redis.delete(self.claim_key(file_hash))
+
+        return parts_left == 0
 
-    if os.path.exists(path):
-        return "", True
+    def fail(
+        self,
+        file_hash: str,
+    ) -> None:
+        self.redis.hset(self.prefix + file_hash, "status", self.FAILED)
+        self.redis.delete(self.claim_key(file_hash))
 
-    with open(path, "wb") as tempfile:
-        for chunk in file.chunks():
-            tempfile.write(chunk)
 
-    return path, False
+upload_index = UploadIndex()
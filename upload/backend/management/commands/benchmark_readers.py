@@ -0,0 +1,108 @@
+# coding=utf-8
+
+import os
+import time
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import typing as tp
+
+from django.core.management.base import BaseCommand
+
+from backend.readers import (
+    BaseReader,
+    CHUNK_SIZE,
+    ColumnarCSVReader,
+    CSVReader,
+    XMLReader,
+    chunk_length,
+)
+
+
+class DOMXMLReader(BaseReader):
+    """
+    Former XML reader, parses the whole document before reading products.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.root = ET.parse(path).getroot()
+        self.products = self.root.iterfind("product")
+
+    def read_chunk(self):
+        return [
+            {elem.tag: elem.text for elem in product}
+            for _, product in zip(range(CHUNK_SIZE), self.products)
+        ]
+
+
+def scale_file(
+    path: str,
+    times: int,
+) -> str:
+    """
+    Repeat products from file `times` times.
+    :return: path to generated file.
+    """
+
+    with open(path) as file:
+        content = file.read()
+
+    fd, scaled_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1])
+    with os.fdopen(fd, "w") as scaled:
+        if path.endswith(".xml"):
+            body = content[content.index("<products>") + len("<products>"):content.rindex("</products>")]
+            scaled.write("<products>")
+            for _ in range(times):
+                scaled.write(body)
+            scaled.write("</products>\n")
+        else:
+            header, body = content.split("\n", 1)
+            scaled.write(header + "\n")
+            for _ in range(times):
+                scaled.write(body)
+
+    return scaled_path
+
+
+class Command(BaseCommand):
+    help = "Measure time and peak memory of product file readers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument("--scale", type=int, default=1, help="repeat products in file that many times")
+
+    def measure(
+        self,
+        reader_class: tp.Type[BaseReader],
+        path: str,
+    ) -> tp.Tuple[int, float, float]:
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        rows = 0
+        reader = reader_class(path)
+        while chunk := reader.read_chunk():
+            rows += chunk_length(chunk)
+
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return rows, elapsed, peak / 2 ** 20
+
+    def handle(self, *args, **options):
+        for path in options["paths"]:
+            scaled_path = scale_file(path, options["scale"]) if options["scale"] > 1 else path
+            size = os.path.getsize(scaled_path) / 2 ** 20
+
+            readers = [DOMXMLReader, XMLReader] if path.endswith(".xml") else [CSVReader, ColumnarCSVReader]
+            for reader_class in readers:
+                rows, elapsed, peak = self.measure(reader_class, scaled_path)
+                self.stdout.write(
+                    f"{os.path.basename(path)} ({size:.1f} MiB) {reader_class.__name__:<18}"
+                    f"{rows:>10} rows{elapsed:>8.2f} s{peak:>10.1f} MiB peak"
+                )
+
+            if scaled_path != path:
+                os.remove(scaled_path)
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.7 on 2026-10-18 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_importjob_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.ImportJob')),
+            ],
+            options={
+                'verbose_name': 'Import chunk',
+                'verbose_name_plural': 'Import chunks',
+                'unique_together': {('job', 'key')},
+            },
+        ),
+    ]
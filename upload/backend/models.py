@@ -0,0 +1,197 @@
+# coding=utf-8
+
+import typing as tp
+
+from django.db import models
+from django.db.models import (
+    Case,
+    F,
+    Value,
+    When,
+)
+from django.utils import timezone
+
+
+class ImportJob(models.Model):
+    """
+    Progress of import of uploaded file, updated by upload workers (read, publish)
+    and by import consumers (parse, insert).
+    """
+
+    PARSING = "parsing"
+    IMPORTING = "importing"
+    DONE = "done"
+    FAILED = "failed"
+
+    owner = models.IntegerField(
+    )
+    file_hash = models.CharField(
+        max_length=128,  # blake2b hex digest
+        db_index=True,
+    )
+    format = models.CharField(
+        max_length=8,
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=(
+            (PARSING, "Parsing"),
+            (IMPORTING, "Importing"),
+            (DONE, "Done"),
+            (FAILED, "Failed"),
+        ),
+        default=PARSING,
+    )
+
+    chunks_total = models.IntegerField(default=0)
+    chunks_done = models.IntegerField(default=0)
+    chunks_failed = models.IntegerField(default=0)
+    rows_total = models.IntegerField(default=0)
+    rows_done = models.IntegerField(default=0)
+    rows_inserted = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+
+    # seconds spent by all workers on every stage
+    read_seconds = models.FloatField(default=0)
+    publish_seconds = models.FloatField(default=0)
+    parse_seconds = models.FloatField(default=0)
+    insert_seconds = models.FloatField(default=0)
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+    )
+    parsed_at = models.DateTimeField(
+        null=True,
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+    )
+
+    @staticmethod
+    def chunk_read(
+        id_: int,
+        rows: int,
+        read_seconds: float,
+    ) -> None:
+        ImportJob.objects.filter(id=id_).update(
+            chunks_total=F("chunks_total") + 1,
+            rows_total=F("rows_total") + rows,
+            read_seconds=F("read_seconds") + read_seconds,
+        )
+
+    @staticmethod
+    def part_published(
+        id_: int,
+        publish_seconds: float,
+    ) -> None:
+        ImportJob.objects.filter(id=id_).update(
+            publish_seconds=F("publish_seconds") + publish_seconds,
+        )
+
+    @staticmethod
+    def parsed(
+        id_: int,
+    ) -> None:
+        """
+        Every chunk of file is published, job is finished as soon as they are imported.
+        """
+
+        ImportJob.objects.filter(id=id_, status=ImportJob.PARSING).update(
+            status=ImportJob.IMPORTING,
+            parsed_at=timezone.now(),
+        )
+        ImportJob.finish_if_complete(id_)
+
+    @staticmethod
+    def fail(
+        id_: int,
+    ) -> None:
+        ImportJob.objects.filter(id=id_).update(
+            status=ImportJob.FAILED,
+            finished_at=timezone.now(),
+        )
+
+    @staticmethod
+    def finish_if_complete(
+        id_: int,
+    ) -> None:
+        ImportJob.objects.filter(
+            id=id_,
+            status=ImportJob.IMPORTING,
+            chunks_total__lte=F("chunks_done") + F("chunks_failed"),
+        ).update(
+            status=Case(
+                When(chunks_failed__gt=0, then=Value(ImportJob.FAILED)),
+                default=Value(ImportJob.DONE),
+            ),
+            finished_at=timezone.now(),
+        )
+
+    def report(
+        self,
+    ) -> tp.Dict[str, tp.Any]:
+        """
+        :return: progress, rate, ETA and stage timings of job.
+        """
+
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.created_at).total_seconds()
+        rows_per_second = self.rows_done / elapsed if elapsed > 0 else 0
+
+        eta = None
+        if self.finished_at is None and rows_per_second > 0:
+            # while file is being parsed total is only known so far
+            eta = max(self.rows_total - self.rows_done, 0) / rows_per_second
+
+        return {
+            "id":     self.id,
+            "hash":   self.file_hash,
+            "status": self.status,
+            "chunks": {
+                "total":  self.chunks_total,
+                "done":   self.chunks_done,
+                "failed": self.chunks_failed,
+            },
+            "rows": {
+                "total":    self.rows_total,
+                "done":     self.rows_done,
+                "inserted": self.rows_inserted,
+                "updated":  self.rows_updated,
+            },
+            "progress":        self.rows_done / self.rows_total if self.rows_total else 0,
+            "rows_per_second": rows_per_second,
+            "eta_seconds":     eta,
+            "elapsed_seconds": elapsed,
+            "timings": {
+                "read":    self.read_seconds,
+                "publish": self.publish_seconds,
+                "parse":   self.parse_seconds,
+                "insert":  self.insert_seconds,
+            },
+            "created_at":  self.created_at,
+            "parsed_at":   self.parsed_at,
+            "finished_at": self.finished_at,
+        }
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+
+
+class ImportChunk(models.Model):
+    """
+    Chunk of import job counted by import consumers, so that chunk redelivered by broker is not counted twice.
+    """
+
+    job = models.ForeignKey(
+        ImportJob,
+        on_delete=models.CASCADE,
+    )
+    key = models.CharField(
+        max_length=255,
+    )
+
+    class Meta:
+        verbose_name = "Import chunk"
+        verbose_name_plural = "Import chunks"
+        unique_together = [("job", "key")]
@@ -2,51 +2,83 @@
 
 import os
 import json
+import zlib
 
 import pika
 
+from mq.publisher import (
+    Delivery,
+    Publisher,
+)
 
-class MessageQueueProvider:
+from backend.readers import Chunk
+
+
+# larger chunks are handed over through files in shared `/tmp/files`
+INLINE_CHUNK_LIMIT = int(os.environ.get("IMPORT_INLINE_CHUNK_LIMIT", 1024 * 1024))  # bytes
+
+
+class MessageQueueProvider(Publisher):
     """
-    Provides messages to RabbitMQ.
+    Publishes import chunks and notifications about chunk files.
     """
 
-    def __init__(
-        self,
-    ) -> None:
-        self.connection_ = None
-        return
-
-    def _restore_connection(self):
-        self.connection_ = pika.BlockingConnection(
-            parameters=pika.ConnectionParameters(
-                host=os.environ.get("MQ_HOST"),
-                port=int(os.environ.get("MQ_PORT")),
-                heartbeat=None,
-            )
-        )
-
     def chunk_ready(
         self,
         path: str,
+        job_id: int,
         queue: str = os.environ.get("IMPORT_QUEUE")
-    ) -> None:
-        if not self.connection_ or self.connection_.is_closed:
-            self._restore_connection()
-
-        channel = self.connection_.channel()
-        channel.queue_declare(queue)
-
+    ) -> Delivery:
         body = json.dumps(
             obj={
-                "path": path,
+                "path":  path,
+                "job":   job_id,
+                "chunk": os.path.basename(path),
             }
         )
 
-        channel.basic_publish(
-            exchange="",
-            routing_key=queue,
+        return self.publish(queue, body.encode())
+
+    def send_chunk(
+        self,
+        chunk: Chunk,
+        job_id: int,
+        key: str,
+        queue: str = os.environ.get("IMPORT_QUEUE")
+    ) -> bool:
+        """
+        Send chunk inside message body as compressed JSON.
+        :param chunk: products, either rows or columns.
+        :param job_id: import job the chunk belongs to.
+        :param key: chunk key unique within job.
+        :param queue: import queue.
+        :return: whether chunk was sent, oversized chunks are not.
+        """
+
+        body = zlib.compress(
+            json.dumps(
+                obj={
+                    "columns" if isinstance(chunk, dict) else "products": chunk,
+                    "job": job_id,
+                    "chunk": key,
+                },
+                separators=(",", ":"),
+            ).encode()
+        )
+
+        if len(body) > INLINE_CHUNK_LIMIT:
+            return False
+
+        self.publish(
+            queue=queue,
             body=body,
+            properties=pika.BasicProperties(
+                content_type="application/json",
+                content_encoding="deflate",
+            ),
         )
 
-        return
+        return True
+
+
+message_queue_provider = MessageQueueProvider()
@@ -1,14 +1,46 @@
 # coding=utf-8
 
+import os
 import csv
 import xml.etree.ElementTree as ET
+
+import typing as tp
+
 from abc import (
     ABC,
     abstractmethod,
 )
+from collections import deque
+
+import pandas as pd
+
+
+CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 512))
+# `pandas` overhead per batch pays off only on large chunks
+COLUMNAR_CHUNK_SIZE = int(os.environ.get("IMPORT_COLUMNAR_CHUNK_SIZE", 8192))
+SPLIT_BLOCK_SIZE = 1024 * 1024  # bytes
+
+PRODUCT_COLUMNS = ("id", "title", "category")
 
+# chunk of products is either list of rows or dict of "id", "title" and "category" columns
+Chunk = tp.Union[tp.List[tp.Dict[str, str]], tp.Dict[str, tp.List[str]]]
 
-CHUNK_SIZE = 512
+
+def chunk_length(chunk: Chunk) -> int:
+    return len(chunk["id"]) if isinstance(chunk, dict) else len(chunk)
+
+
+def missing_columns(
+    header: bytes,
+) -> tp.List[str]:
+    """
+    :param header: first line of CSV file.
+    :return: product columns absent from header, in the order of `PRODUCT_COLUMNS`.
+    """
+
+    headers = next(csv.reader([header.decode(errors="replace")]), [])
+
+    return [column for column in PRODUCT_COLUMNS if column not in headers]
 
 
 class BaseReader(ABC):
@@ -19,11 +51,30 @@ class BaseReader(ABC):
 
 
 class CSVReader(BaseReader):
+    """
+    Reads rows of whole file or of byte range starting and ending at row boundaries.
+    """
 
-    def __init__(self, path: str) -> None:
-        self.file = open(path)
-        self.reader = csv.reader(self.file)
-        self.headers = next(self.reader)
+    def __init__(
+        self,
+        path: str,
+        start: int = 0,
+        end: tp.Optional[int] = None,
+    ) -> None:
+        self.file = open(path, "rb")
+        self.headers = next(csv.reader([self.file.readline().decode()]))
+        self.end = end
+        if start:
+            self.file.seek(start)
+
+        self.reader = csv.reader(self._lines())
+
+    def _lines(self) -> tp.Iterator[str]:
+        while self.end is None or self.file.tell() < self.end:
+            line = self.file.readline()
+            if not line:
+                break
+            yield line.decode()
 
     def read_chunk(self):
         chunk = []
@@ -37,19 +88,184 @@ class CSVReader(BaseReader):
         return chunk
 
 
+class RangeFile:
+    """
+    Binary file which ends at `end` offset.
+    """
+
+    def __init__(
+        self,
+        file: tp.BinaryIO,
+        end: tp.Optional[int] = None,
+    ) -> None:
+        self.file = file
+        self.end = end
+
+    def read(self, size: int = -1) -> bytes:
+        if self.end is not None:
+            left = max(self.end - self.file.tell(), 0)
+            size = left if size < 0 else min(size, left)
+
+        return self.file.read(size)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        line = self.file.readline() if self.end is None or self.file.tell() < self.end else b""
+        if not line:
+            raise StopIteration
+        return line
+
+
+class ColumnarCSVReader(BaseReader):
+    """
+    Reads whole file or byte range with `pandas` parser, only product columns are parsed.
+    Chunks are columns (`{"id": [...], "title": [...], "category": [...]}`), rows without
+    id or title are dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int = 0,
+        end: tp.Optional[int] = None,
+    ) -> None:
+        self.file = open(path, "rb")
+        header = self.file.readline()
+        self.headers = next(csv.reader([header.decode()]))
+
+        missing = missing_columns(header)
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+
+        if start:
+            self.file.seek(start)
+
+        self.batches = pd.read_csv(
+            RangeFile(self.file, end),
+            header=None,
+            names=self.headers,
+            usecols=PRODUCT_COLUMNS,
+            dtype=str,
+            keep_default_na=False,
+            na_values=[""],
+            chunksize=COLUMNAR_CHUNK_SIZE,
+        )
+
+    def read_chunk(self):
+        for batch in self.batches:
+            batch = batch.dropna(subset=["id", "title"])
+            if batch.empty:
+                continue
+
+            batch["category"] = batch["category"].fillna("")
+
+            return {
+                column: batch[column].tolist()
+                for column in PRODUCT_COLUMNS
+            }
+
+        return {}
+
+
+def split_csv(
+    path: str,
+    parts: int,
+    block_size: int = SPLIT_BLOCK_SIZE,
+) -> tp.List[tp.Tuple[int, int]]:
+    """
+    Split CSV file into byte ranges which can be parsed independently.
+    Range boundaries are moved forward to the nearest line break outside of quoted field,
+    so rows with quoted newlines are never cut. Only quote parity is tracked, file is scanned
+    block by block without parsing.
+    :param path: path to CSV file.
+    :param parts: desired number of ranges, fewer are returned for small files.
+    :param block_size: bytes read at once.
+    :return: `[start, end)` ranges covering all rows after header.
+    """
+
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as file:
+        header_end = len(file.readline())
+
+        targets = deque(
+            header_end + (size - header_end) * part // parts
+            for part in range(1, parts)
+        )
+        offsets = [header_end]
+        position = header_end
+        in_quotes = False
+
+        while targets and (block := file.read(block_size)):
+            # quotes before `scanned` are already accounted for in `in_quotes`
+            scanned = 0
+
+            while targets and targets[0] - position < len(block):
+                index = max(targets[0] - position, scanned)
+                in_quotes ^= block.count(b'"', scanned, index) % 2 == 1
+                scanned = index
+
+                newline = block.find(b"\n", scanned)
+                while newline != -1:
+                    in_quotes ^= block.count(b'"', scanned, newline) % 2 == 1
+                    scanned = newline + 1
+                    if not in_quotes:
+                        break
+                    newline = block.find(b"\n", scanned)
+
+                if newline == -1:
+                    # row continues in next block
+                    targets[0] = position + len(block)
+                    break
+
+                offsets.append(position + scanned)
+                while targets and targets[0] <= offsets[-1]:
+                    targets.popleft()
+
+            in_quotes ^= block.count(b'"', scanned) % 2 == 1
+            position += len(block)
+
+    offsets.append(size)
+
+    return [
+        (start, end)
+        for start, end in zip(offsets, offsets[1:])
+        if start < end
+    ]
+
+
 class XMLReader(BaseReader):
+    """
+    Streams `product` children of root element, memory usage does not depend on file size.
+    """
 
     def __init__(self, path: str) -> None:
-        self.root = ET.parse(path).getroot()
-        self.products = self.root.iterfind("product")
+        self.events = ET.iterparse(path, events=("start", "end"))
+        _, self.root = next(self.events)
+        self.depth = 1
 
     def read_chunk(self):
         chunk = []
 
-        for _, product in zip(range(CHUNK_SIZE), self.products):
+        for event, elem in self.events:
+            if event == "start":
+                self.depth += 1
+                continue
+
+            self.depth -= 1
+            if self.depth != 1 or elem.tag != "product":
+                continue
+
             chunk.append({
-                elem.tag: elem.text
-                for elem in product
+                child.tag: child.text
+                for child in elem
             })
+            # drop already parsed products
+            self.root.clear()
+
+            if len(chunk) == CHUNK_SIZE:
+                break
 
         return chunk
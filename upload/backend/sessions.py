@@ -0,0 +1,274 @@
+# coding=utf-8
+
+import os
+import time
+import uuid
+import hashlib
+import threading
+
+import typing as tp
+
+from backend.files import (
+    UPLOAD_DIR,
+    upload_index,
+)
+
+
+SESSION_TTL = 24 * 60 * 60  # seconds since last part
+CLEANUP_INTERVAL = 60 * 60  # seconds
+FINALIZE_TTL = 10 * 60  # seconds, enough to hash file of `MAX_LENGTH`
+READ_SIZE = 64 * 1024  # bytes
+MAX_LENGTH = int(os.environ.get("UPLOAD_MAX_LENGTH", 5 * 1024 ** 3))  # bytes
+
+
+class UploadSessions:
+    """
+    Resumable uploads: file is created with known length, then its parts are written at given offsets
+    (in any order and in parallel), finally it is saved under its hash like a regular upload.
+    Received ranges are stored in Redis, so parts may be handled by different processes.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "upload_session:",
+    ) -> None:
+        self.prefix = prefix
+        # session -> hash of contiguous prefix of file and its length, kept only by process which received the parts
+        self.hashes_: tp.Dict[str, tp.Tuple[tp.Any, int]] = {}
+        self.lock_ = threading.Lock()
+        self.cleaned_at_ = 0.0
+        return
+
+    @property
+    def redis(self):
+        return upload_index.redis
+
+    @staticmethod
+    def path(
+        session_id: str,
+    ) -> str:
+        return os.path.join(UPLOAD_DIR, f".session_{session_id}")
+
+    def create(
+        self,
+        owner: int,
+        filename: str,
+        length: int,
+    ) -> str:
+        """
+        :param owner: profile id of uploader.
+        :param filename: name of uploaded file.
+        :param length: size of the whole file in bytes.
+        :return: session id.
+        """
+
+        if time.monotonic() - self.cleaned_at_ > CLEANUP_INTERVAL:
+            self.cleanup()
+
+        session_id = uuid.uuid4().hex
+
+        # session exists before its file, so file is never taken for expired one by cleanup
+        key = self.prefix + session_id
+        with self.redis.pipeline() as pipeline:
+            pipeline.hset(key, mapping={"owner": owner, "filename": filename, "length": length})
+            pipeline.expire(key, SESSION_TTL)
+            pipeline.execute()
+
+        with open(self.path(session_id), "wb") as file:
+            file.truncate(length)
+
+        with self.lock_:
+            self.hashes_[session_id] = (hashlib.blake2b(), 0)
+
+        return session_id
+
+    def get(
+        self,
+        session_id: str,
+    ) -> tp.Optional[tp.Dict[str, tp.Union[str, int]]]:
+        session = self.redis.hgetall(self.prefix + session_id)
+        if not session:
+            return None
+
+        return {
+            "owner":    int(session["owner"]),
+            "filename": session["filename"],
+            "length":   int(session["length"]),
+        }
+
+    def ranges(
+        self,
+        session_id: str,
+    ) -> tp.List[tp.Tuple[int, int]]:
+        """
+        :return: merged `[start, end)` ranges received so far.
+        """
+
+        ranges = sorted(
+            tuple(map(int, member.split(":")))
+            for member in self.redis.smembers(self.prefix + session_id + ":ranges")
+        )
+
+        merged = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        return merged
+
+    def offset(
+        self,
+        session_id: str,
+    ) -> int:
+        """
+        :return: length of contiguous prefix received so far, upload is resumed from it.
+        """
+
+        ranges = self.ranges(session_id)
+
+        return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+    def write(
+        self,
+        session_id: str,
+        offset: int,
+        stream,
+        length: int,
+    ) -> int:
+        """
+        Write part from stream straight to file.
+        :param session_id: session id.
+        :param offset: position of part in file.
+        :param stream: file-like object with `.read` method (request).
+        :param length: size of part in bytes.
+        :return: number of written bytes, less than `length` if client disconnected.
+        """
+
+        with self.lock_:
+            file_hash, hashed = self.hashes_.pop(session_id, (None, 0))
+        if offset != hashed:
+            # part does not continue hashed prefix, the rest is hashed on finalize
+            file_hash = None
+
+        written = 0
+        fd = os.open(self.path(session_id), os.O_WRONLY)
+        try:
+            while written < length and (data := stream.read(min(READ_SIZE, length - written))):
+                os.pwrite(fd, data, offset + written)
+                written += len(data)
+                if file_hash is not None:
+                    file_hash.update(data)
+        finally:
+            os.close(fd)
+
+        if file_hash is not None:
+            with self.lock_:
+                self.hashes_[session_id] = (file_hash, offset + written)
+
+        if written:
+            key = self.prefix + session_id
+            with self.redis.pipeline() as pipeline:
+                pipeline.sadd(key + ":ranges", f"{offset}:{offset + written}")
+                pipeline.expire(key, SESSION_TTL)
+                pipeline.expire(key + ":ranges", SESSION_TTL)
+                pipeline.execute()
+
+        return written
+
+    def claim_finalize(
+        self,
+        session_id: str,
+    ) -> bool:
+        """
+        Mark session as being finalized, so concurrent requests do not hash and remove the same file.
+        Marker outlives session and expires in `FINALIZE_TTL`, so it is released by a crashed process too.
+        :return: whether session is claimed by this call.
+        """
+
+        return bool(self.redis.set(self.prefix + session_id + ":finalizing", 1, nx=True, ex=FINALIZE_TTL))
+
+    def release_finalize(
+        self,
+        session_id: str,
+    ) -> None:
+        self.redis.delete(self.prefix + session_id + ":finalizing")
+
+    def finalize(
+        self,
+        session_id: str,
+    ) -> tp.Tuple[str, str]:
+        """
+        Save complete file under its hash and close session.
+        :return: path to saved file and its hash.
+        """
+
+        path = self.path(session_id)
+
+        with self.lock_:
+            file_hash, hashed = self.hashes_.pop(session_id, (hashlib.blake2b(), 0))
+
+        with open(path, "rb") as file:
+            file.seek(hashed)
+            while data := file.read(READ_SIZE):
+                file_hash.update(data)
+
+        saved_path = os.path.join(UPLOAD_DIR, file_hash.hexdigest())
+        try:
+            os.link(path, saved_path)
+        except FileExistsError:
+            pass
+
+        self.delete(session_id)
+
+        return saved_path, file_hash.hexdigest()
+
+    def delete(
+        self,
+        session_id: str,
+    ) -> None:
+        with self.lock_:
+            self.hashes_.pop(session_id, None)
+
+        self.redis.delete(self.prefix + session_id, self.prefix + session_id + ":ranges")
+
+        if os.path.exists(self.path(session_id)):
+            os.remove(self.path(session_id))
+
+    def cleanup(
+        self,
+    ) -> None:
+        """
+        Remove files and prefix hashes of sessions expired in Redis, they are never finalized or deleted.
+        """
+
+        self.cleaned_at_ = time.monotonic()
+
+        with self.lock_:
+            hashed = list(self.hashes_)
+        files = [
+            name[len(".session_"):]
+            for name in os.listdir(UPLOAD_DIR)
+            if name.startswith(".session_")
+        ]
+        session_ids = list(set(hashed + files))
+
+        with self.redis.pipeline() as pipeline:
+            for session_id in session_ids:
+                pipeline.exists(self.prefix + session_id)
+            expired = [session_id for session_id, exists in zip(session_ids, pipeline.execute()) if not exists]
+
+        for session_id in expired:
+            with self.lock_:
+                self.hashes_.pop(session_id, None)
+            try:
+                os.remove(self.path(session_id))
+            except FileNotFoundError:
+                pass
+
+        if expired:
+            print(f"removed {len(expired)} expired upload sessions")
+
+
+upload_sessions = UploadSessions()
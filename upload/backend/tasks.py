@@ -1,39 +1,137 @@
 # coding=utf-8
 
+import os
 import json
+import time
 import typing as tp
 
+from django.conf import settings
+from django.db.models import F
 from django_q.tasks import async_task
 
-from backend.mq import MessageQueueProvider
+from mq.publisher import ConfirmationTimeout
+
+from backend.files import upload_index
+from backend.models import ImportJob
+from backend.mq import message_queue_provider
 from backend.readers import (
-    CSVReader,
+    BaseReader,
+    Chunk,
+    ColumnarCSVReader,
     XMLReader,
+    chunk_length,
+    split_csv,
 )
 
 
+# "inline" sends chunks inside messages, "file" always hands them over through `/tmp/files`
+IMPORT_TRANSPORT = os.environ.get("IMPORT_TRANSPORT", "inline")
+
+
 def notify_import(task) -> None:
-    path = task.result
-    mq_provider = MessageQueueProvider()
-    mq_provider.chunk_ready(path)
+    _, path, job_id = task.args
 
+    if not task.success:
+        ImportJob.objects.filter(id=job_id).update(chunks_failed=F("chunks_failed") + 1)
+        ImportJob.finish_if_complete(job_id)
+        return
 
-def save_to_file(chunk: tp.List[tp.Dict[str, str]], path: str) -> str:
+    delivery = message_queue_provider.chunk_ready(path, job_id)
+    if not message_queue_provider.wait_for_confirm(delivery):
+        raise ConfirmationTimeout(f"notification about {path} is not confirmed by broker")
+
+
+def save_to_file(
+    chunk: Chunk,
+    path: str,
+    job_id: int,
+) -> str:
     with open(path, "w") as file:
         json.dump(chunk, file)
 
     return path
 
 
-def _async_import(path: str, format_: str):
-    reader = CSVReader(path) if format_ == "csv" else XMLReader(path)
-
+def _send_chunks(reader, path: str, job_id: int, file_hash: str) -> int:
+    rows = 0
     index = 0
-    while chunk := reader.read_chunk():
+    publish_seconds = 0
+
+    while True:
+        started = time.perf_counter()
+        chunk = reader.read_chunk()
+        if not chunk:
+            break
+        ImportJob.chunk_read(job_id, chunk_length(chunk), time.perf_counter() - started)
+
+        started = time.perf_counter()
         chunk_path = path + f"_chunk_{index}"
-        async_task(save_to_file, chunk, chunk_path, hook=notify_import)
+        # the same key for both transports, consumers count every chunk of job once by it
+        key = os.path.basename(chunk_path)
+        if IMPORT_TRANSPORT != "inline" or not message_queue_provider.send_chunk(chunk, job_id, key):
+            async_task(save_to_file, chunk, chunk_path, job_id, hook=notify_import)
+        publish_seconds += time.perf_counter() - started
+
+        rows += chunk_length(chunk)
         index += 1
+        upload_index.heartbeat(file_hash)
+
+    started = time.perf_counter()
+    if not message_queue_provider.wait_for_confirms():
+        # part is marked as failed by caller
+        raise ConfirmationTimeout(f"chunks of {path} are not confirmed by broker")
+    ImportJob.part_published(job_id, publish_seconds + time.perf_counter() - started)
+
+    return rows
+
+
+def _parse_part(
+    path: str,
+    chunk_path: str,
+    job_id: int,
+    reader_class: tp.Type[BaseReader],
+    *args,
+) -> None:
+    file_hash = os.path.basename(path)
+
+    try:
+        rows = _send_chunks(reader_class(path, *args), chunk_path, job_id, file_hash)
+    except Exception:
+        upload_index.fail(file_hash)
+        ImportJob.fail(job_id)
+        raise
+
+    if upload_index.part_parsed(file_hash, rows):
+        ImportJob.parsed(job_id)
+
+
+def _import_range(path: str, start: int, end: int, job_id: int) -> None:
+    _parse_part(path, path + f"_{start}", job_id, ColumnarCSVReader, start, end)
+
+
+def _async_import(path: str, format_: str, job_id: int):
+    file_hash = os.path.basename(path)
+
+    if format_ != "csv":
+        upload_index.start(file_hash, parts=1)
+        _parse_part(path, path, job_id, XMLReader)
+        return
+
+    try:
+        ranges = split_csv(path, settings.Q_CLUSTER["workers"])
+    except Exception:
+        upload_index.fail(file_hash)
+        ImportJob.fail(job_id)
+        raise
+
+    upload_index.start(file_hash, parts=max(len(ranges), 1))
+    if not ranges and upload_index.part_parsed(file_hash, rows=0):
+        ImportJob.parsed(job_id)
+
+    # every range is parsed by its own worker, so parsing scales with cluster size
+    for start, end in ranges:
+        async_task(_import_range, path, start, end, job_id)
 
 
-def async_import(path: str, format_: str) -> None:
-    async_task(_async_import, path, format_)
+def async_import(path: str, format_: str, job_id: int) -> None:
+    async_task(_async_import, path, format_, job_id)
@@ -1,7 +1,6 @@
 # coding=utf-8
 
-import os
-import grpc
+import typing as tp
 
 from django.core.files.uploadedfile import File
 
@@ -14,39 +13,137 @@ from rest_framework.parsers import (
 )
 from rest_framework.status import (
     HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
 )
 
-from api.proto.auth_pb2_grpc import AuthStub
-from api.proto.auth_pb2 import (
-    Profile,
-    Token,
-)
+from auth_client.verification import get_profile_by_token
+
+from api.proto.auth_pb2 import Profile
 
-from backend.files import save_to_tempdir
+from backend.files import (
+    save_to_tempdir,
+    upload_index,
+)
+from backend.models import ImportJob
+from backend.readers import missing_columns
+from backend.sessions import (
+    MAX_LENGTH,
+    upload_sessions,
+)
 from backend.tasks import async_import
 
 
-def get_profile_by_token(
+FORMATS = ["csv", "xml"]
+
+
+def unauthorized() -> Response:
+    return Response(
+        data={
+            "message": "Invalid credentials."
+        },
+        status=HTTP_401_UNAUTHORIZED,
+    )
+
+
+def invalid_columns(
+    header: bytes,
+) -> tp.Optional[Response]:
+    """
+    Check header of `.csv` file before import is started, so that file without product columns
+    is rejected by request instead of failing in worker.
+    :param header: first line of file.
+    :return: error response, `None` if all product columns are present.
+    """
+
+    missing = missing_columns(header)
+    if not missing:
+        return None
+
+    return Response(
+        data={
+            "message": f"Missing columns: {', '.join(missing)}.",
+        },
+        status=HTTP_400_BAD_REQUEST,
+    )
+
+
+def start_import(
+    path: str,
+    file_hash: str,
+    format_: str,
+    owner: int,
+) -> Response:
+    """
+    Start import of saved file unless the same file is uploaded already.
+    :return: response with import status of file and import job id.
+    """
+
+    previous_job = upload_index.get(file_hash).get("job")
+
+    if not upload_index.claim(file_hash):
+        return Response(
+            data={
+                "message": "File already uploaded.",
+                "hash":    file_hash,
+                **upload_index.get(file_hash),
+            },
+            status=HTTP_200_OK,
+        )
+
+    if previous_job is not None:
+        # previous import failed or its worker died, its job would never finish otherwise
+        ImportJob.fail(previous_job)
+
+    job = ImportJob.objects.create(
+        owner=owner,
+        file_hash=file_hash,
+        format=format_,
+    )
+    upload_index.attach_job(file_hash, job.id)
+
+    async_import(path, format_, job.id)
+
+    return Response(
+        data={
+            "message": "Successful upload, product import has started.",
+            "hash":    file_hash,
+            "job":     job.id,
+        },
+        status=HTTP_200_OK,
+    )
+
+
+def get_session(
     request: Request,
-) -> Profile:
+    session_id: str,
+) -> tp.Tuple[tp.Optional[tp.Dict[str, tp.Union[str, int]]], tp.Optional[Response]]:
     """
-    Get profile associated with token from request.
-    :param request: request with token in header.
-    :return: profile (from gRPC specification).
+    Find upload session of authenticated user.
+    :return: session and `None`, or `None` and error response.
     """
 
-    token_from_request = request.META.get("HTTP_AUTHORIZATION", "").split("Bearer ")[-1]
+    profile: Profile = get_profile_by_token(request)
+
+    if not profile.has_valid_token:
+        return None, unauthorized()
 
-    auth_grpc = os.environ.get("AUTH_GRPC_HOST") + ":" + os.environ.get("AUTH_GRPC_PORT")
+    session = upload_sessions.get(session_id)
 
-    with grpc.insecure_channel(auth_grpc) as channel:
-        stub = AuthStub(channel)
-        token = Token(token=token_from_request)
-        profile = stub.Verify(token)
+    if session is None or session["owner"] != profile.id:
+        return None, Response(
+            data={
+                "message": "Upload not found.",
+            },
+            status=HTTP_404_NOT_FOUND,
+        )
 
-    return profile
+    return session, None
 
 
 class ProductUpload(APIView):
@@ -67,12 +164,7 @@ class ProductUpload(APIView):
         profile: Profile = get_profile_by_token(request)
 
         if not profile.has_valid_token:
-            return Response(
-                data={
-                    "message": "Invalid credentials."
-                },
-                status=HTTP_401_UNAUTHORIZED,
-            )
+            return unauthorized()
 
         if "file" not in request.data:
             return Response(
@@ -85,7 +177,7 @@ class ProductUpload(APIView):
         file: File = request.data["file"]
         format_: str = file.name.split(".")[-1]
 
-        if format_ not in ["csv", "xml"]:
+        if format_ not in FORMATS:
             return Response(
                 data={
                     "message": "Invalid format.",
@@ -93,22 +185,258 @@ class ProductUpload(APIView):
                 status=HTTP_400_BAD_REQUEST,
             )
 
-        path, already_exists = save_to_tempdir(file)
+        if format_ == "csv":
+            file.seek(0)
+            error = invalid_columns(file.readline())
+            if error is not None:
+                file.close()
+                return error
+
+        path, file_hash = save_to_tempdir(file)
         file.close()
 
-        if already_exists:
+        return start_import(path, file_hash, format_, profile.id)
+
+
+class UploadSessionCreate(APIView):
+
+    def post(
+        self,
+        request: Request,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Create resumable upload of file with given name and `Upload-Length` header.
+        :param request: request with token in header and `filename` in data.
+        :return: response with session id, parts are sent to `Location`.
+        """
+
+        profile: Profile = get_profile_by_token(request)
+
+        if not profile.has_valid_token:
+            return unauthorized()
+
+        filename: str = request.data.get("filename", "")
+        format_: str = filename.split(".")[-1]
+
+        if format_ not in FORMATS:
+            return Response(
+                data={
+                    "message": "Invalid format.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            length = int(request.headers["Upload-Length"])
+        except (KeyError, ValueError):
+            length = -1
+
+        if length <= 0:
             return Response(
                 data={
-                    "message": "File already exists.",
+                    "message": "Invalid Upload-Length.",
                 },
                 status=HTTP_400_BAD_REQUEST,
             )
 
-        async_import(path, format_)
+        if length > MAX_LENGTH:
+            return Response(
+                data={
+                    "message": f"File is too large, maximum is {MAX_LENGTH} bytes.",
+                },
+                status=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        session_id = upload_sessions.create(profile.id, filename, length)
 
         return Response(
             data={
-                "message": "Successful upload, product import has started.",
+                "session": session_id,
+            },
+            status=HTTP_201_CREATED,
+            headers={
+                "Location":      f"/api/upload/sessions/{session_id}",
+                "Upload-Offset": "0",
+            },
+        )
+
+
+class UploadSessionView(APIView):
+    # parts are read from request stream directly, body is never parsed
+    parser_classes = []
+
+    def head(
+        self,
+        request: Request,
+        session_id: str,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Get offset to resume upload from.
+        """
+
+        session, error = get_session(request, session_id)
+        if error is not None:
+            return error
+
+        return Response(
+            status=HTTP_200_OK,
+            headers={
+                "Upload-Offset": str(upload_sessions.offset(session_id)),
+                "Upload-Length": str(session["length"]),
             },
+        )
+
+    def patch(
+        self,
+        request: Request,
+        session_id: str,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Write request body at `Upload-Offset` of file, parts may be sent in parallel.
+        :return: response with offset to resume upload from.
+        """
+
+        session, error = get_session(request, session_id)
+        if error is not None:
+            return error
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            offset, length = -1, -1
+
+        if offset < 0 or length < 0 or offset + length > session["length"]:
+            return Response(
+                data={
+                    "message": "Invalid Upload-Offset or Content-Length.",
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        written = upload_sessions.write(session_id, offset, request, length)
+
+        return Response(
+            status=HTTP_204_NO_CONTENT,
+            headers={
+                "Upload-Offset": str(offset + written),
+            },
+        )
+
+    def delete(
+        self,
+        request: Request,
+        session_id: str,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Abort upload.
+        """
+
+        session, error = get_session(request, session_id)
+        if error is not None:
+            return error
+
+        upload_sessions.delete(session_id)
+
+        return Response(
+            status=HTTP_204_NO_CONTENT,
+        )
+
+
+class UploadSessionFinalize(APIView):
+
+    def post(
+        self,
+        request: Request,
+        session_id: str,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Complete upload and start import.
+        :return: response whether request is successful.
+        """
+
+        session, error = get_session(request, session_id)
+        if error is not None:
+            return error
+
+        if upload_sessions.ranges(session_id) != [(0, session["length"])]:
+            return Response(
+                data={
+                    "message": "Upload is incomplete.",
+                    "offset":  upload_sessions.offset(session_id),
+                },
+                status=HTTP_409_CONFLICT,
+            )
+
+        if not upload_sessions.claim_finalize(session_id):
+            return Response(
+                data={
+                    "message": "Upload is already being finalized.",
+                },
+                status=HTTP_409_CONFLICT,
+            )
+
+        format_: str = session["filename"].split(".")[-1]
+
+        try:
+            if format_ == "csv":
+                with open(upload_sessions.path(session_id), "rb") as file:
+                    error = invalid_columns(file.readline())
+                if error is not None:
+                    # complete file never becomes valid
+                    upload_sessions.delete(session_id)
+                    return error
+
+            path, file_hash = upload_sessions.finalize(session_id)
+        except Exception:
+            upload_sessions.release_finalize(session_id)
+            raise
+
+        return start_import(path, file_hash, format_, session["owner"])
+
+
+class ImportJobView(APIView):
+
+    def get(
+        self,
+        request: Request,
+        job_id: int,
+        *args,
+        **kwargs
+    ) -> Response:
+        """
+        Get progress of import: processed chunks and rows, rate, ETA and time spent on every stage.
+        :param request: request with token in header.
+        :param job_id: id of import job returned on upload.
+        :return: response with import job report.
+        """
+
+        profile: Profile = get_profile_by_token(request)
+
+        if not profile.has_valid_token:
+            return unauthorized()
+
+        job = ImportJob.objects.filter(id=job_id, owner=profile.id).first()
+
+        if job is None:
+            return Response(
+                data={
+                    "message": "Import job not found.",
+                },
+                status=HTTP_404_NOT_FOUND,
+            )
+
+        return Response(
+            data=job.report(),
             status=HTTP_200_OK,
         )
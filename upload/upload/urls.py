@@ -16,11 +16,21 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from backend.views import ProductUpload
+from backend.views import (
+    ImportJobView,
+    ProductUpload,
+    UploadSessionCreate,
+    UploadSessionFinalize,
+    UploadSessionView,
+)
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     path('api/upload', ProductUpload.as_view()),
+    path('api/upload/<int:job_id>', ImportJobView.as_view()),
+    path('api/upload/sessions', UploadSessionCreate.as_view()),
+    path('api/upload/sessions/<str:session_id>', UploadSessionView.as_view()),
+    path('api/upload/sessions/<str:session_id>/finalize', UploadSessionFinalize.as_view()),
 ]